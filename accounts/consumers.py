@@ -1,28 +1,60 @@
+import asyncio
 import json
-from asgiref.sync import async_to_sync
-from channels.generic.websocket import WebsocketConsumer
 
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 
-class NotificationConsumer(WebsocketConsumer):
-    def connect(self):
-        user_id = self.scope['url_route']['kwargs']['user_id']
-        if not user_id:
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+        streams a user's notifications, bursts arriving within the batch window are sent as
+        one frame and a heartbeat frame keeps idle connections alive
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.group_name = None
+        self.pending_notifications = []
+        self.flush_handle = None
+        self.heartbeat_task = None
+
+    async def connect(self):
+        user = self.scope['user']
+        user_id = self.scope['url_route']['kwargs'].get('user_id', user.id)
+        if not user.is_authenticated or user_id != user.id:
             # Reject the connection
-            self.close()
-        else:
-            group_name = f'notification_{user_id}'
-            async_to_sync(self.channel_layer.group_add)(group_name, self.channel_name)
-            self.accept()
-
-    def disconnect(self, code):
-        user_id = self.scope['url_route']['kwargs']['user_id']
-        group_name = f'notification_{user_id}'
-        async_to_sync(self.channel_layer.group_discard)(group_name, self.channel_name)
-        self.close()
-
-    def send_notification(self, event):
-        self.send(
-            text_data=json.dumps({
-                'notification': event['notification']
-            })
-        )
+            await self.close()
+            return
+
+        self.group_name = f'notification_{user.id}'
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        self.heartbeat_task = asyncio.ensure_future(self.send_heartbeats())
+
+    async def disconnect(self, code):
+        if self.group_name is None:
+            return
+        self.heartbeat_task.cancel()
+        if self.flush_handle:
+            self.flush_handle.cancel()
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def send_notification(self, event):
+        self.pending_notifications.append(event['notification'])
+        if self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(
+                settings.NOTIFICATION_BATCH_WINDOW,
+                lambda: asyncio.ensure_future(self.flush_notifications()))
+
+    async def flush_notifications(self):
+        notifications, self.pending_notifications = self.pending_notifications, []
+        self.flush_handle = None
+        if len(notifications) == 1:
+            await self.send(text_data=json.dumps({'notification': notifications[0]}))
+        elif notifications:
+            await self.send(text_data=json.dumps({'notifications': notifications}))
+
+    async def send_heartbeats(self):
+        while True:
+            await asyncio.sleep(settings.WEBSOCKET_HEARTBEAT_INTERVAL)
+            await self.send(text_data=json.dumps({'type': 'heartbeat'}))
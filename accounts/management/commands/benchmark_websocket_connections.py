@@ -0,0 +1,58 @@
+import asyncio
+import time
+import tracemalloc
+
+from asgiref.sync import async_to_sync
+from channels.layers import DEFAULT_CHANNEL_LAYER, InMemoryChannelLayer, channel_layers
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import EmailAuthenticatedUser
+from accounts.routing import websocket_urlpatterns
+
+
+class Command(BaseCommand):
+    help = 'Opens many idle notification websockets in one process and reports memory growth'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=2000)
+        parser.add_argument('--step', type=int, default=1000)
+        parser.add_argument('--idle', type=float, default=5,
+                            help='seconds to hold the connections open before closing them')
+
+    def handle(self, *args, **options):
+        channel_layers.set(DEFAULT_CHANNEL_LAYER, InMemoryChannelLayer())
+        tracemalloc.start()
+        async_to_sync(self.run)(options['connections'], options['step'], options['idle'])
+        tracemalloc.stop()
+
+    async def run(self, connections, step, idle):
+        application = URLRouter(websocket_urlpatterns)
+        communicators = []
+        baseline, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        while len(communicators) < connections:
+            for _ in range(min(step, connections - len(communicators))):
+                user_id = len(communicators) + 1
+                communicator = WebsocketCommunicator(application, 'ws/notification')
+                # the users are authenticated by the jwt middleware in front of the router
+                communicator.scope['user'] = EmailAuthenticatedUser(id=user_id)
+                connected, _ = await communicator.connect()
+                if not connected:
+                    raise CommandError('websocket connection was rejected')
+                communicators.append(communicator)
+            self.report(len(communicators), baseline)
+        self.stdout.write(f'opened {len(communicators)} connections in '
+                          f'{time.perf_counter() - start:.2f}s')
+
+        await asyncio.sleep(idle)
+        self.stdout.write(f'after {idle}s idle:')
+        self.report(len(communicators), baseline)
+        await asyncio.gather(*(communicator.disconnect() for communicator in communicators))
+
+    def report(self, connections, baseline):
+        current, _ = tracemalloc.get_traced_memory()
+        used = current - baseline
+        self.stdout.write(f'{connections} connections: {used / 2 ** 20:.1f}MiB, '
+                          f'{used / connections / 1024:.1f}KiB per connection')
@@ -0,0 +1,29 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+
+@database_sync_to_async
+def get_user_from_token(raw_token):
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+        authenticates websocket connections from the access token in the `token` query parameter
+    """
+
+    async def __call__(self, scope, receive, send):
+        query_params = parse_qs(scope.get('query_string', b'').decode())
+        raw_token = query_params.get('token', [None])[0]
+        scope = dict(scope, user=await get_user_from_token(raw_token) if raw_token
+                     else AnonymousUser())
+        return await super().__call__(scope, receive, send)
@@ -3,5 +3,6 @@ from django.urls import path
 from accounts import consumers
 
 websocket_urlpatterns = [
+    path('ws/notification', consumers.NotificationConsumer.as_asgi()),
     path('ws/notification/<int:user_id>', consumers.NotificationConsumer.as_asgi()),
 ]
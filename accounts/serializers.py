@@ -6,11 +6,11 @@ from accounts.models import EmailAuthenticatedUser as User, FriendRequest
 
 
 class UserSerializer(serializers.ModelSerializer):
-    fullname = serializers.CharField(source='get_full_name')
+    fullname = serializers.CharField(source='get_full_name', read_only=True)
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'phone_number', 'display_picture', 'first_name',
-                  'last_name']
+                  'last_name', 'fullname']
 
 
 class RegistrationSerializer(serializers.ModelSerializer):
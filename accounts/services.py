@@ -1,11 +1,9 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from django.conf import settings
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from twilio.base.exceptions import TwilioRestException
+from budget_tracker.mailer import BulkEmailSender
+from budget_tracker.push import send_push_notifications
+from budget_tracker.sms import SMSSender
 
 from accounts.models import EmailAuthenticatedUser
 
@@ -26,15 +24,7 @@ class EmailNotification:
             return self._for_password_recovery
 
     def _send_email_notification(self, email_data):
-        html_message = render_to_string(template_name=email_data["template"],
-                                        context=email_data["context"]
-                                        )
-        send_mail(subject=email_data["subject"],
-                  message=email_data["message"],
-                  html_message=html_message,
-                  recipient_list=email_data["recipient_list"],
-                  from_email=settings.SENDER_EMAIL
-                  )
+        BulkEmailSender().send([email_data])
 
     def _for_friend_request(self, data):
         context = {'sender': data['user']['username'],
@@ -87,15 +77,11 @@ class SMSNotification:
             return self._for_friend_request
 
     def _send_sms_notification(self, message, recipient_phone):
+        self._send_sms_notifications(message, [recipient_phone])
+
+    def _send_sms_notifications(self, message, recipient_phones):
         message += '\nFrom BudgetTracker'
-        try:
-            settings.TWILIO_CLIENT.messages.create(
-                body=message,
-                from_=settings.PHN_NUM,
-                to=recipient_phone
-            )
-        except TwilioRestException as twilio_exception:
-            print(twilio_exception)
+        SMSSender().send_many([(message, recipient_phone) for recipient_phone in recipient_phones])
 
     def _for_friend_request(self, data):
         message = f'Friend request received from {data["user"]["username"]}'
@@ -115,14 +101,7 @@ class PushNotification:
             return self._for_friend_request
 
     def _send_push_notification(self, message, group_name):
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                "type": "send_notification",
-                "notification": message,
-            },
-        )
+        send_push_notifications(message, [group_name])
 
     def _for_friend_request(self, data):
         message = f'Friend request received from {data["user"]["username"]}'
@@ -1,17 +1,43 @@
 from celery import shared_task
+from django.conf import settings
+from redis.exceptions import RedisError
+
 from accounts.services import Notification
+from budget_tracker.sms import SMSDeliveryError
 
 
 @shared_task
 def send_friend_request_notifications(friend_request):
-    Notification().notify_all(Notification.FRIEND_REQUEST, friend_request)
+    for channel_task in (send_push_notification, send_email_notification,
+                         send_sms_notification):
+        channel_task.delay(Notification.FRIEND_REQUEST, friend_request)
 
 
-@shared_task
+@shared_task(autoretry_for=(OSError, RedisError), retry_backoff=1, retry_backoff_max=10,
+             max_retries=3)
+def send_push_notification(notification_type, data):
+    Notification().notify_push(notification_type, data)
+
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=600,
+             max_retries=5, rate_limit=settings.EMAIL_TASK_RATE_LIMIT)
+def send_email_notification(notification_type, data):
+    Notification().notify_email(notification_type, data)
+
+
+@shared_task(autoretry_for=(OSError, SMSDeliveryError), retry_backoff=True,
+             retry_backoff_max=600, max_retries=5)
+def send_sms_notification(notification_type, data):
+    Notification().notify_sms(notification_type, data)
+
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=600,
+             max_retries=5, rate_limit=settings.EMAIL_TASK_RATE_LIMIT)
 def send_user_verification_email_notification(user):
     Notification().notify_email(Notification.USER_VERIFICATION, {'user_id': user})
 
 
-@shared_task
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=600,
+             max_retries=5, rate_limit=settings.EMAIL_TASK_RATE_LIMIT)
 def send_password_recovery_email_notification(user):
     Notification().notify_email(Notification.PASSWORD_RECOVERY, {'user_id': user})
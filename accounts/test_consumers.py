@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.middleware import JWTAuthMiddleware
+from accounts.models import EmailAuthenticatedUser
+from accounts.routing import websocket_urlpatterns
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+
+
+@pytest.fixture(name='user')
+def fixture_user(settings):
+    settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+    return EmailAuthenticatedUser.objects.create_user(username='socket', email='socket@test.com',
+                                                      password='password')
+
+
+async def connect(path):
+    communicator = WebsocketCommunicator(application, path)
+    connected, _ = await communicator.connect()
+    return communicator, connected
+
+
+@pytest.mark.parametrize('path', ['ws/notification', 'ws/notification?token=invalid',
+                                  'ws/notification/{other_id}?token={token}'])
+def test_connection_rejected_without_matching_token(user, path):
+    async def check():
+        communicator, connected = await connect(path.format(token=AccessToken.for_user(user),
+                                                            other_id=user.id + 1))
+        await communicator.disconnect()
+        return connected
+
+    assert not async_to_sync(check)()
+
+
+def test_notification_burst_sent_as_one_frame(user):
+    async def receive_burst():
+        communicator, connected = await connect(
+            f'ws/notification?token={AccessToken.for_user(user)}')
+        assert connected
+        for notification in ('first', 'second'):
+            await get_channel_layer().group_send(f'notification_{user.id}', {
+                'type': 'send_notification', 'notification': notification})
+        frame = await communicator.receive_from(timeout=1)
+        await communicator.disconnect()
+        return json.loads(frame)
+
+    assert async_to_sync(receive_burst)() == {'notifications': ['first', 'second']}
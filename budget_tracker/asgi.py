@@ -9,16 +9,20 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
-import accounts.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'budget_tracker.settings')
+# set up django before importing code that touches models
+django_asgi_app = get_asgi_application()
+
+# pylint: disable=wrong-import-position
+import accounts.routing
+from accounts.middleware import JWTAuthMiddleware
 
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
+    "http": django_asgi_app,
+    "websocket": JWTAuthMiddleware(
         URLRouter(
             accounts.routing.websocket_urlpatterns,
         )
@@ -25,6 +25,26 @@ app.conf.beat_schedule = {
     'update_scheduled_transactions': {
         'task': 'wallet.tasks.update_scheduled_transactions',
         'schedule': crontab(minute='*/1')
+    },
+    'drain_notification_outbox': {
+        'task': 'wallet.tasks.drain_notification_outbox',
+        'schedule': 5.0
+    },
+    'send_notification_digests': {
+        'task': 'wallet.tasks.send_notification_digests',
+        'schedule': crontab(minute='*/1')
+    },
+    'reconcile_account_balances': {
+        'task': 'wallet.tasks.reconcile_account_balances',
+        'schedule': crontab(hour=3, minute=0)
+    },
+    'take_ledger_snapshots': {
+        'task': 'wallet.tasks.take_ledger_snapshots',
+        'schedule': crontab(minute=0)
+    },
+    'delete_expired_transaction_reports': {
+        'task': 'wallet.tasks.delete_expired_transaction_reports',
+        'schedule': crontab(hour=4, minute=0)
     }
 }
 
@@ -0,0 +1,49 @@
+""" Batched email sending shared by the notification services """
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+
+
+@lru_cache(maxsize=None)
+def get_cached_template(template_name):
+    """
+    returns the compiled template, resolving and parsing it only once per process
+    """
+    return get_template(template_name)
+
+
+class BulkEmailSender:
+    """
+        renders a list of emails and sends them over one reused connection,
+        every recipient gets its own message
+    """
+
+    def __init__(self, connection=None):
+        self.connection = connection
+
+    def build_messages(self, email_data):
+        html_message = get_cached_template(email_data["template"]).render(email_data["context"])
+        messages = []
+        for recipient in email_data["recipient_list"]:
+            message = EmailMultiAlternatives(subject=email_data["subject"],
+                                             body=email_data["message"],
+                                             from_email=settings.SENDER_EMAIL,
+                                             to=[recipient],
+                                             connection=self.connection)
+            message.attach_alternative(html_message, 'text/html')
+            messages.append(message)
+        return messages
+
+    def send(self, emails_data):
+        """
+        returns number of messages sent
+        """
+        messages = [message for email_data in emails_data
+                    for message in self.build_messages(email_data)]
+        if not messages:
+            return 0
+        connection = self.connection or get_connection()
+        return connection.send_messages(messages)
@@ -0,0 +1,64 @@
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection, send_mail
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from budget_tracker.mailer import BulkEmailSender
+
+EMAIL_BACKENDS = {
+    'locmem': 'django.core.mail.backends.locmem.EmailBackend',
+    'file': 'django.core.mail.backends.filebased.EmailBackend',
+}
+
+
+class Command(BaseCommand):
+    help = 'Compares per message email sending with batched sending over one connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000)
+        parser.add_argument('--backend', choices=EMAIL_BACKENDS.keys(), default='locmem')
+
+    def handle(self, *args, **options):
+        emails_data = [self.get_email_data(index) for index in range(options['messages'])]
+        with tempfile.TemporaryDirectory() as file_path:
+            def connection_factory():
+                return get_connection(EMAIL_BACKENDS[options['backend']], file_path=file_path)
+
+            self.report('per message', self.send_one_by_one, emails_data, connection_factory)
+            self.report('batched', self.send_batched, emails_data, connection_factory)
+
+    def report(self, label, sender, emails_data, connection_factory):
+        start = time.perf_counter()
+        sender(emails_data, connection_factory)
+        seconds = time.perf_counter() - start
+        self.stdout.write(f'{label}: {len(emails_data)} messages in {seconds:.3f}s, '
+                          f'{len(emails_data) / seconds:.0f} messages/s')
+
+    @staticmethod
+    def send_one_by_one(emails_data, connection_factory):
+        for email_data in emails_data:
+            send_mail(subject=email_data['subject'],
+                      message=email_data['message'],
+                      html_message=render_to_string(email_data['template'],
+                                                    email_data['context']),
+                      recipient_list=email_data['recipient_list'],
+                      from_email=settings.SENDER_EMAIL,
+                      connection=connection_factory())
+
+    @staticmethod
+    def send_batched(emails_data, connection_factory):
+        BulkEmailSender(connection=connection_factory()).send(emails_data)
+
+    @staticmethod
+    def get_email_data(index):
+        title = f'Benchmark split {index} paid by benchmark'
+        return {'template': 'emails/splitIncludeNotificationTemplate.html',
+                'context': {'title': title, 'category': 'Food', 'total_amount': 100,
+                            'paying_friend': 'benchmark', 'button_text': 'View More',
+                            'button_link': settings.FRONTEND_URL},
+                'subject': title,
+                'message': title,
+                'recipient_list': [f'user{index}@example.com']}
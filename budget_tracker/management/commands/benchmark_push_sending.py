@@ -0,0 +1,41 @@
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from budget_tracker.push import send_push_notifications
+
+
+class Command(BaseCommand):
+    help = 'Compares per group and batched push fan-out latency on the in memory channel layer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, default=20,
+                            help='friends notified by one fan-out')
+        parser.add_argument('--rounds', type=int, default=100)
+
+    def handle(self, *args, **options):
+        group_names = [f'notification_{index}' for index in range(options['groups'])]
+        channel_layer = InMemoryChannelLayer(capacity=options['rounds'] * 2)
+        for group_name in group_names:
+            channel_name = async_to_sync(channel_layer.new_channel)()
+            async_to_sync(channel_layer.group_add)(group_name, channel_name)
+
+        def send_one_by_one():
+            for group_name in group_names:
+                async_to_sync(channel_layer.group_send)(
+                    group_name, {"type": "send_notification", "notification": 'benchmark'})
+
+        def send_batched():
+            send_push_notifications('benchmark', group_names, channel_layer=channel_layer)
+
+        self.report('per group', send_one_by_one, options['rounds'])
+        self.report('batched', send_batched, options['rounds'])
+
+    def report(self, label, fan_out, rounds):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fan_out()
+        latency = (time.perf_counter() - start) / rounds
+        self.stdout.write(f'{label}: {latency * 1000:.2f}ms per fan-out')
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from budget_tracker.sms import LocMemSMSBackend, SMSSender
+
+
+class Command(BaseCommand):
+    help = 'Compares sequential and pooled sms sending against the in process fake backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='simulated provider round trip in seconds')
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--rate', type=int, default=0,
+                            help='messages per second allowed for the account, 0 for no limit')
+
+    def handle(self, *args, **options):
+        messages = [('Benchmark message', f'+1555{index:07d}')
+                    for index in range(options['messages'])]
+        backend = LocMemSMSBackend(latency=options['latency'])
+
+        start = time.perf_counter()
+        for body, recipient_phone in messages:
+            backend.send(body, recipient_phone)
+        self.report('sequential', len(messages), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        sent = SMSSender(backend=backend, max_workers=options['workers'],
+                         rate_limit=options['rate']).send_many(messages + messages)
+        self.report(f'pooled ({options["workers"]} workers, duplicates collapsed)', sent,
+                    time.perf_counter() - start)
+
+    def report(self, label, sent, seconds):
+        self.stdout.write(f'{label}: {sent} messages in {seconds:.3f}s, '
+                          f'{sent / seconds:.0f} messages/s')
@@ -1,7 +1,125 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class StandardPagination(pagination.PageNumberPagination):
     page_size = 5
     page_size_query_param = 'page_size'
     max_page_size = 50
+
+
+class TransactionPagination(StandardPagination):
+    """
+        page number pagination by default, switches to keyset pagination over
+        (transaction_time, id) when the client sends ?pagination=cursor or a cursor,
+        keyset pages cost the same however far back they are and skip COUNT(*)
+        when the client sends ?count=false
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    mode_query_param = 'pagination'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.request = None
+        self.keyset = False
+        self.count = None
+        self.next_position = None
+        self.previous_position = None
+        self.results = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = (request.query_params.get(self.mode_query_param) == 'cursor' or
+                       self.cursor_query_param in request.query_params)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+        self.count = None
+        if request.query_params.get(self.count_query_param) not in ('0', 'false'):
+            self.count = queryset.count()
+
+        if position is None:
+            page_queryset = queryset.order_by('-transaction_time', '-id')
+        elif reverse:
+            page_queryset = queryset.filter(
+                Q(transaction_time__gt=position[0]) |
+                Q(transaction_time=position[0], id__gt=position[1])
+            ).order_by('transaction_time', 'id')
+        else:
+            page_queryset = queryset.filter(
+                Q(transaction_time__lt=position[0]) |
+                Q(transaction_time=position[0], id__lt=position[1])
+            ).order_by('-transaction_time', '-id')
+
+        results = list(page_queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        has_next = has_more if not reverse else True
+        has_previous = position is not None if not reverse else has_more
+        self.next_position = self.get_position(results[-1]) if results and has_next else None
+        self.previous_position = self.get_position(results[0]) \
+            if results and has_previous else None
+        self.results = results
+        return results
+
+    def get_position(self, item):
+        return item.transaction_time, item.pk
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            transaction_time = parse_datetime(cursor['time'])
+            if transaction_time is None:
+                raise ValueError(cursor['time'])
+            return (transaction_time, int(cursor['id'])), bool(cursor.get('reverse'))
+        except (binascii.Error, KeyError, TypeError, ValueError) as exception:
+            raise NotFound(self.invalid_cursor_message) from exception
+
+    def encode_cursor(self, position, reverse):
+        cursor = {'time': position[0].isoformat(), 'id': position[1], 'reverse': reverse}
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        response_data = OrderedDict([('next', self.get_next_link()),
+                                     ('previous', self.get_previous_link()),
+                                     ('results', data)])
+        if self.count is not None:
+            response_data['count'] = self.count
+            response_data.move_to_end('count', last=False)
+        return Response(response_data)
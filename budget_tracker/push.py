@@ -0,0 +1,30 @@
+""" Push notification delivery over the channel layer shared by the notification services """
+
+import asyncio
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+async def _group_send_many(channel_layer, group_messages):
+    await asyncio.gather(*(
+        channel_layer.group_send(group_name, {"type": "send_notification",
+                                              "notification": message})
+        for group_name, message in group_messages
+    ))
+
+
+def send_push_notification_batch(notifications, channel_layer=None):
+    """
+    sends every (message, group names) pair concurrently in a single pass over the
+    event loop bridge, a message reaches each group once
+    """
+    group_messages = list(dict.fromkeys(
+        (group_name, message) for message, group_names in notifications
+        for group_name in group_names))
+    if group_messages:
+        async_to_sync(_group_send_many)(channel_layer or get_channel_layer(), group_messages)
+
+
+def send_push_notifications(message, group_names, channel_layer=None):
+    send_push_notification_batch([(message, group_names)], channel_layer=channel_layer)
@@ -48,6 +48,8 @@ INSTALLED_APPS = [
     # my apps
     'wallet.apps.WalletConfig',
     'accounts.apps.AccountsConfig',
+    # project wide management commands
+    'budget_tracker',
 ]
 
 MIDDLEWARE = [
@@ -91,6 +93,13 @@ CHANNEL_LAYERS = {
     },
 }
 
+# most expenses and incomes accepted by one transactionBatch request
+TRANSACTION_BATCH_MAX_SIZE = 100
+
+# notifications reaching a websocket within this many seconds are sent as one frame
+NOTIFICATION_BATCH_WINDOW = 0.05
+WEBSOCKET_HEARTBEAT_INTERVAL = 30
+
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
@@ -155,6 +164,13 @@ STATICFILES_DIRS = (
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Generated transaction reports, kept outside MEDIA_ROOT so they are not served publicly
+REPORTS_ROOT = os.path.join(BASE_DIR, 'reports')
+# a report still pending after this many seconds is treated as lost and requested again
+TRANSACTION_REPORT_TIMEOUT = 600
+# generated reports are deleted this many days after they were requested
+TRANSACTION_REPORT_RETENTION_DAYS = 7
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -212,13 +228,44 @@ EMAIL_HOST_PASSWORD = SENDGRID_API_KEY
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 
+# number of emails rendered and sent over one smtp connection by a worker
+EMAIL_BATCH_SIZE = 100
+
 # twilio sms API
 TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
 PHN_NUM = os.environ.get('TWILIO_PHN_NUM')
 TWILIO_CLIENT = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+# budget_tracker.sms.LocMemSMSBackend keeps messages in memory instead
+SMS_BACKEND = os.environ.get('SMS_BACKEND', 'budget_tracker.sms.TwilioSMSBackend')
+SMS_MAX_WORKERS = 4
+# messages per second per sending account, 0 disables the limiter
+SMS_RATE_LIMIT = 1
 
 # Celery
 CELERY_TIMEZONE = 'Asia/Karachi'
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'django-db'
+
+# every notification channel has its own queue, so a backed up email or sms provider
+# never delays push notifications. run one worker per queue with its own concurrency e.g.
+# celery -A budget_tracker worker -Q push -c 16
+# celery -A budget_tracker worker -Q email -c 4
+# celery -A budget_tracker worker -Q sms -c 2
+CELERY_TASK_ROUTES = {
+    '*.send_push_notification*': {'queue': 'push'},
+    '*email_notification*': {'queue': 'email'},
+    '*.send_sms_notification*': {'queue': 'sms'},
+    '*.send_sms_messages': {'queue': 'sms'},
+}
+# notifications claimed from the outbox per drain transaction
+NOTIFICATION_OUTBOX_BATCH_SIZE = 500
+# email and sms for a recipient within this many seconds are merged into one digest, 0 disables
+NOTIFICATION_DIGEST_WINDOW = 300
+SMS_DIGEST_MAX_LINES = 3
+# per worker rate limit of email tasks, sms messages are limited per account by SMS_RATE_LIMIT
+EMAIL_TASK_RATE_LIMIT = '20/s'
+# the nightly balance reconciliation only reports drift unless this is set
+BALANCE_RECONCILIATION_REPAIR = False
+# ledger entries younger than this many seconds are left out of the hourly balance snapshots
+LEDGER_SNAPSHOT_LAG = 60
@@ -0,0 +1,147 @@
+""" SMS delivery backends and a concurrent sender shared by the notification services """
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from twilio.base.exceptions import TwilioRestException
+
+
+class TwilioSMSBackend:
+    """
+        sends messages with the configured twilio client
+    """
+    @property
+    def account_key(self):
+        return settings.TWILIO_ACCOUNT_SID
+
+    def send(self, body, recipient_phone):
+        try:
+            settings.TWILIO_CLIENT.messages.create(body=body,
+                                                   from_=settings.PHN_NUM,
+                                                   to=recipient_phone)
+        except TwilioRestException as twilio_exception:
+            # throttling and provider outages are retried by the sms task
+            if twilio_exception.status == 429 or twilio_exception.status >= 500:
+                raise
+            print(twilio_exception)
+
+
+class LocMemSMSBackend:
+    """
+        in process fake keeping sent messages in memory, latency simulates the provider round trip
+    """
+    account_key = 'locmem'
+    outbox = []
+    _lock = threading.Lock()
+
+    def __init__(self, latency=0):
+        self.latency = latency
+
+    def send(self, body, recipient_phone):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.outbox.append({'body': body, 'to': recipient_phone})
+
+
+class SMSDeliveryError(Exception):
+    """
+        raised once every message was attempted, carries the (body, recipient phone) pairs
+        that failed so only those are retried
+    """
+
+    def __init__(self, errors, messages):
+        super().__init__(errors[0])
+        self.errors = errors
+        self.messages = messages
+
+
+def get_sms_backend():
+    return import_string(settings.SMS_BACKEND)()
+
+
+class RateLimiter:
+    """
+        token bucket allowing `rate` calls per second, shared by all threads of a process,
+        the bucket holds at least one token so rates below one call per second still pass
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(account_key, rate):
+    """
+    returns the process wide limiter of the sending account, None when rate limiting is off
+    """
+    if not rate:
+        return None
+    with _rate_limiters_lock:
+        if (account_key, rate) not in _rate_limiters:
+            _rate_limiters[(account_key, rate)] = RateLimiter(rate)
+        return _rate_limiters[(account_key, rate)]
+
+
+class SMSSender:
+    """
+        sends messages concurrently on a bounded thread pool, collapsing duplicates
+    """
+
+    def __init__(self, backend=None, max_workers=None, rate_limit=None):
+        self.backend = backend or get_sms_backend()
+        self.max_workers = max_workers or settings.SMS_MAX_WORKERS
+        if rate_limit is None:
+            rate_limit = settings.SMS_RATE_LIMIT
+        self.rate_limiter = get_rate_limiter(self.backend.account_key, rate_limit)
+
+    def _send(self, body, recipient_phone):
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        self.backend.send(body, recipient_phone)
+
+    def send_many(self, messages):
+        """
+        messages are (body, recipient phone) pairs, returns number of messages sent
+        raises SMSDeliveryError with the failed pairs once every message has been attempted
+        """
+        unique_messages = list(dict.fromkeys(
+            (body, recipient_phone) for body, recipient_phone in messages if recipient_phone))
+        if len(unique_messages) == 1:
+            try:
+                self._send(*unique_messages[0])
+            except Exception as error:
+                raise SMSDeliveryError([error], unique_messages) from error
+            return 1
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._send, body, recipient_phone)
+                       for body, recipient_phone in unique_messages]
+        failed = [(message, future.exception()) for message, future in zip(unique_messages, futures)
+                  if future.exception()]
+        if failed:
+            raise SMSDeliveryError([error for _, error in failed],
+                                   [message for message, _ in failed]) from failed[0][1]
+        return len(unique_messages)
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import pytest
+from django.utils.timezone import make_aware
+
+from wallet.models import CashAccount, Transaction, TransactionCategories
+
+pytestmark = pytest.mark.django_db
+
+EXPENSES_URL = '/expenselist/?month=3&pagination=cursor&page_size=2'
+
+
+@pytest.fixture(name='expenses')
+def fixture_expenses(user):
+    account = CashAccount.objects.create(user=user, title='Cash', balance=1000)
+    # most rows share their transaction_time with another, so pages are split inside ties
+    days = [15, 15, 15, 10, 10, 10, 5]
+    expenses = [Transaction.objects.create(
+        user=user, cash_account=account, title=f'Expense {index}', amount=10,
+        category=TransactionCategories.Food.value,
+        transaction_time=make_aware(datetime(2021, 3, day, 12))) for index, day in enumerate(days)]
+    return sorted(expenses, key=lambda expense: (expense.transaction_time, expense.id),
+                  reverse=True)
+
+
+def get_page(api_client, url):
+    response = api_client.get(url)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_cursor_pages_walk_forward_and_back_through_ties(api_client, expenses):
+    pages = [get_page(api_client, EXPENSES_URL)]
+    while pages[-1]['next']:
+        pages.append(get_page(api_client, pages[-1]['next']))
+    forward_ids = [[expense['id'] for expense in page['results']] for page in pages]
+
+    assert sum(forward_ids, []) == [expense.id for expense in expenses]
+    assert pages[0]['previous'] is None
+    assert all(page['count'] == len(expenses) for page in pages)
+
+    backward_ids = [forward_ids[-1]]
+    page = pages[-1]
+    while page['previous']:
+        page = get_page(api_client, page['previous'])
+        backward_ids.append([expense['id'] for expense in page['results']])
+    assert backward_ids == forward_ids[::-1]
+
+
+@pytest.mark.usefixtures('expenses')
+def test_count_is_skipped_on_request(api_client):
+    page = get_page(api_client, EXPENSES_URL + '&count=false')
+    assert 'count' not in page
+    assert len(page['results']) == 2
+    assert 'count' not in get_page(api_client, page['next'])
+
+
+@pytest.mark.parametrize('cursor', ['not-base64!', 'eyJ0aW1lIjogIm5vdyJ9', 'e30='])
+def test_invalid_cursor_is_not_found(api_client, cursor):
+    response = api_client.get('/expenselist/', {'cursor': cursor})
+    assert response.status_code == 404
+    assert response.json() == {'detail': 'Invalid cursor'}
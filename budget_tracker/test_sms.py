@@ -0,0 +1,57 @@
+from unittest import mock
+
+import pytest
+
+from budget_tracker.celery import app
+from budget_tracker.sms import LocMemSMSBackend, RateLimiter, SMSDeliveryError, SMSSender
+from wallet.services import Notification
+from wallet.tasks import send_sms_messages, send_sms_notification_batch
+
+
+@pytest.fixture(name='sms_backend')
+def fixture_sms_backend(settings):
+    settings.SMS_BACKEND = 'budget_tracker.sms.LocMemSMSBackend'
+    settings.SMS_RATE_LIMIT = 0
+    LocMemSMSBackend.outbox = []
+    failures = {'+2': 2}
+    send = LocMemSMSBackend.send
+
+    def send_or_fail(backend, body, recipient_phone):
+        if failures.get(recipient_phone):
+            failures[recipient_phone] -= 1
+            raise OSError('provider unavailable')
+        send(backend, body, recipient_phone)
+
+    with mock.patch.object(LocMemSMSBackend, 'send', send_or_fail):
+        yield LocMemSMSBackend
+
+
+def test_delivery_error_carries_only_the_failed_messages(sms_backend):
+    with pytest.raises(SMSDeliveryError) as delivery_error:
+        SMSSender().send_many([('one', '+1'), ('two', '+2'), ('three', '+3')])
+    assert delivery_error.value.messages == [('two', '+2')]
+    assert sorted(message['to'] for message in sms_backend.outbox) == ['+1', '+3']
+
+
+def test_batch_hands_only_the_failed_messages_to_the_retry_task(sms_backend):
+    with mock.patch.object(send_sms_messages, 'delay') as retry_delay:
+        send_sms_notification_batch([
+            (Notification.DIGEST, {'message': 'one', 'phone': '+1'}),
+            (Notification.DIGEST, {'message': 'two', 'phone': '+2'})])
+    retry_delay.assert_called_once_with([('two\nFrom BudgetTracker', '+2')])
+
+    send_sms_messages.apply(args=([('two\nFrom BudgetTracker', '+2'),
+                                   ('three\nFrom BudgetTracker', '+3')],))
+    assert [message['to'] for message in sms_backend.outbox] == ['+1', '+3', '+2']
+
+
+def test_rate_below_one_call_per_second_still_sends():
+    RateLimiter(0.5).acquire()
+
+
+@pytest.mark.parametrize('task_name', ['wallet.tasks.send_sms_notification',
+                                       'wallet.tasks.send_sms_notification_batch',
+                                       'wallet.tasks.send_sms_messages',
+                                       'accounts.tasks.send_sms_notification'])
+def test_sms_tasks_run_on_the_sms_queue(task_name):
+    assert app.amqp.router.route({}, task_name)['queue'].name == 'sms'
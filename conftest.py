@@ -0,0 +1,28 @@
+import pytest
+from django.conf import settings
+from rest_framework.test import APIClient
+
+from accounts.models import EmailAuthenticatedUser
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(  # pylint: disable=unused-argument
+        django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    # threads of the concurrency tests wait for each other's locks on a file database,
+    # on the shared cache in memory one they fail with table is locked instead
+    database = settings.DATABASES['default']
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database.setdefault('TEST', {})['NAME'] = str(
+            tmp_path_factory.mktemp('db') / 'test.sqlite3')
+
+
+@pytest.fixture(name='user')
+def fixture_user(db):  # pylint: disable=unused-argument
+    return EmailAuthenticatedUser.objects.create(username='tester', email='tester@example.com')
+
+
+@pytest.fixture(name='api_client')
+def fixture_api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
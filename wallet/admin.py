@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from wallet.models import Transaction, CashAccount, SplitTransaction
+from wallet.models import Transaction, CashAccount, SplitTransaction, MonthlyTransactionSummary, \
+    SplitTransactionMember, LedgerEntry
 
 
 class TransactionAdminInline(admin.TabularInline):
@@ -8,6 +9,11 @@ class TransactionAdminInline(admin.TabularInline):
     extra = 2
 
 
+class SplitTransactionMemberAdminInline(admin.TabularInline):
+    model = SplitTransactionMember
+    extra = 1
+
+
 class CashAccountsAdminInline(admin.TabularInline):
     model = CashAccount
     extra = 1
@@ -24,13 +30,30 @@ class TransactionAdmin(admin.ModelAdmin):
 
 
 class SplitTransactionAdmin(admin.ModelAdmin):
+    inlines = [SplitTransactionMemberAdminInline]
     list_display = ('title', 'creator', 'category', 'paying_friend', 'get_friends_in_split')
 
     def get_friends_in_split(self, obj):
         return "\n".join([user.username for user in obj.get_all_friends_involved()])
 
 
+class MonthlyTransactionSummaryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'cash_account', 'year', 'month', 'category', 'total_amount',
+                    'transaction_count')
+
+
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('group', 'cash_account', 'amount', 'category', 'creation_time')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 admin.site.register(CashAccount, CashAccountsAdmin)
 admin.site.register(Transaction, TransactionAdmin)
 admin.site.register(SplitTransaction, SplitTransactionAdmin)
+admin.site.register(MonthlyTransactionSummary, MonthlyTransactionSummaryAdmin)
+admin.site.register(LedgerEntry, LedgerEntryAdmin)
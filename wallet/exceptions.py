@@ -10,3 +10,14 @@ class AccountBalanceLimitException(Exception):
 
     def __str__(self):
         return f'Cash Account of {self.username} does not have enough amount'
+
+
+class TransactionImportError(Exception):
+    """Exception raised when rows of an imported transaction file are invalid"""
+
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = errors
+
+    def __str__(self):
+        return f'{len(self.errors)} invalid rows in imported transactions'
@@ -1,4 +1,5 @@
 import datetime
+from django.db.models import Value
 from rest_framework import filters
 from wallet.models import TransactionCategories
 
@@ -7,16 +8,18 @@ class TransactionFilterBackend(filters.BaseFilterBackend):
 
     def filter_queryset(self, request, queryset, view):
         month = request.GET.get('month') or datetime.date.today().month
+        # scheduled is compared to a value, SQLite can not use a bare boolean column
+        # to search transaction_user_time_idx
         transactions = queryset.filter(user=request.user.id,
                                        transaction_time__month=month,
-                                       scheduled=False)
+                                       scheduled=Value(False))
         return transactions
 
 
 class ScheduledTransactionFilterBackend(filters.BaseFilterBackend):
 
     def filter_queryset(self, request, queryset, view):
-        transactions = queryset.filter(user=request.user.id, scheduled=True)
+        transactions = queryset.filter(user=request.user.id, scheduled=Value(True))
         return transactions
 
 
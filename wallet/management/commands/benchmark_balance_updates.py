@@ -0,0 +1,75 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q, Sum
+from rest_framework.test import APIClient
+
+from accounts.models import EmailAuthenticatedUser
+from wallet.models import CashAccount, Transaction, TransactionCategories
+
+
+class Command(BaseCommand):
+    help = 'Posts concurrent expenses and incomes to one hot cash account and checks that ' \
+           'no balance update is lost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=50,
+                            help='transactions posted by every thread')
+
+    def handle(self, *args, **options):
+        user = EmailAuthenticatedUser.objects.create(username='balance-benchmark',
+                                                     email='balance-benchmark@example.com')
+        account = CashAccount.objects.create(user=user, title='Cash', balance=1000,
+                                             opening_balance=1000)
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                statuses = [status for statuses in executor.map(
+                    lambda _: self.post_transactions(user, account, options['writes']),
+                    range(options['threads'])) for status in statuses]
+            seconds = time.perf_counter() - start
+            self.report(account, statuses, seconds)
+        finally:
+            user.delete()
+
+    def post_transactions(self, user, account, writes):
+        client = APIClient(SERVER_NAME='localhost', raise_request_exception=False)
+        client.force_authenticate(user)
+        statuses = []
+        try:
+            for index in range(writes):
+                income = index % 2 == 0
+                response = client.post(
+                    '/incomelist/' if income else '/expenselist/',
+                    {'title': 'benchmark', 'user': user.id, 'cash_account': account.id,
+                     'amount': 3 if income else 2,
+                     'category': TransactionCategories.Income.value if income else
+                     TransactionCategories.Other.value})
+                statuses.append(response.status_code)
+        finally:
+            connection.close()
+        return statuses
+
+    def report(self, account, statuses, seconds):
+        created = statuses.count(201)
+        income = TransactionCategories.Income.value
+        totals = Transaction.objects.filter(cash_account=account).aggregate(
+            income=Sum('amount', filter=Q(category=income)),
+            expenses=Sum('amount', filter=~Q(category=income)))
+        expected_balance = account.balance + (totals['income'] or 0) - (totals['expenses'] or 0)
+        account.refresh_from_db()
+
+        self.stdout.write(f'{created} of {len(statuses)} transactions written in {seconds:.3f}s, '
+                          f'{created / seconds:.0f} writes/s')
+        if created != len(statuses):
+            self.stdout.write(self.style.WARNING(
+                f'{len(statuses) - created} requests failed and were rolled back'))
+        lost_updates = expected_balance - account.balance
+        if lost_updates or account.total_expenses != (totals['expenses'] or 0):
+            raise CommandError(f'balance {account.balance} expected {expected_balance}, '
+                               f'total expenses {account.total_expenses} expected '
+                               f'{totals["expenses"] or 0}')
+        self.stdout.write(self.style.SUCCESS('No lost balance updates'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from wallet.utils import CashAccountUtils
+
+
+class Command(BaseCommand):
+    help = 'Compares cash account balances with their transactions and ledger and repairs drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true',
+                            help='move drifted balances to the recomputed values')
+
+    def handle(self, *args, **options):
+        drifted_accounts = CashAccountUtils().get_balance_drift()
+        for account, expected in drifted_accounts:
+            self.stdout.write(f'{account.title} (id {account.id}): stored '
+                              f'{account.balance}, expected {expected}')
+        self.finish(drifted_accounts, CashAccountUtils().repair_balance_drift, options['repair'],
+                    'All account balances are consistent')
+
+        # balances are repaired first, the ledger then follows the repaired balances
+        ledger_drifted_accounts = CashAccountUtils().get_ledger_drift()
+        for account, ledger_balance in ledger_drifted_accounts:
+            self.stdout.write(f'{account.title} (id {account.id}): stored '
+                              f'{account.balance}, ledger {ledger_balance}')
+        self.finish(ledger_drifted_accounts, CashAccountUtils().repair_ledger_drift,
+                    options['repair'], 'All account ledgers are consistent')
+
+    def finish(self, drifted_accounts, repair, should_repair, consistent_message):
+        if not drifted_accounts:
+            self.stdout.write(self.style.SUCCESS(consistent_message))
+        elif should_repair:
+            repair(drifted_accounts)
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(drifted_accounts)} accounts'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(drifted_accounts)} accounts drifted, '
+                                                 f'run with --repair to fix them'))
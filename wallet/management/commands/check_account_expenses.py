@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from wallet.utils import CashAccountUtils
+
+
+class Command(BaseCommand):
+    help = 'Compares cash account expense totals with their transactions and repairs drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true',
+                            help='move every drifted total by its drift, expenses written '
+                                 'since the check are kept')
+
+    def handle(self, *args, **options):
+        drifted_accounts = CashAccountUtils().get_expense_drift()
+        for account, expected in drifted_accounts:
+            self.stdout.write(f'{account.title} (id {account.id}): stored '
+                              f'{account.total_expenses}, expected {expected}')
+
+        if not drifted_accounts:
+            self.stdout.write(self.style.SUCCESS('All account expense totals are consistent'))
+        elif options['repair']:
+            CashAccountUtils().repair_expense_drift(drifted_accounts)
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(drifted_accounts)} accounts'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(drifted_accounts)} accounts drifted, '
+                                                 f'run with --repair to fix them'))
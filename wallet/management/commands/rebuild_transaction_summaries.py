@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from wallet.utils import TransactionSummaryUtils
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the monthly transaction summaries from the transactions table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        summaries_count = TransactionSummaryUtils().rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {summaries_count} monthly summaries'))
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def build_monthly_summaries(apps, schema_editor):
+    Transaction = apps.get_model('wallet', 'Transaction')
+    MonthlyTransactionSummary = apps.get_model('wallet', 'MonthlyTransactionSummary')
+    rows = Transaction.objects.filter(scheduled=False).annotate(
+        year=ExtractYear('transaction_time'), month=ExtractMonth('transaction_time')
+    ).values('user', 'cash_account', 'year', 'month', 'category').annotate(
+        total_amount=Sum('amount'), transaction_count=Count('id')).order_by()
+    MonthlyTransactionSummary.objects.bulk_create(
+        [MonthlyTransactionSummary(user_id=row['user'],
+                                   cash_account_id=row['cash_account'],
+                                   year=row['year'],
+                                   month=row['month'],
+                                   category=row['category'],
+                                   total_amount=row['total_amount'],
+                                   transaction_count=row['transaction_count'])
+         for row in rows.iterator()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('wallet', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyTransactionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('category', models.IntegerField(choices=[(0, 'Income'), (1, 'Drink'), (2, 'Fuel'), (3, 'Healthcare'), (4, 'Travel'), (5, 'Food'), (6, 'Grocery'), (7, 'Other')])),
+                ('total_amount', models.IntegerField(default=0)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('cash_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='wallet.cashaccount')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'cash_account', 'year', 'month', 'category')},
+            },
+        ),
+        migrations.RunPython(build_monthly_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:50
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def compute_total_expenses(apps, schema_editor):
+    CashAccount = apps.get_model('wallet', 'CashAccount')
+    Transaction = apps.get_model('wallet', 'Transaction')
+    account_expenses = Transaction.objects.filter(scheduled=False).exclude(category=0).values(
+        'cash_account').annotate(total=Sum('amount')).order_by()
+    accounts = []
+    for row in account_expenses.iterator():
+        accounts.append(CashAccount(pk=row['cash_account'], total_expenses=row['total']))
+    CashAccount.objects.bulk_update(accounts, ['total_expenses'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0002_monthlytransactionsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cashaccount',
+            name='total_expenses',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(compute_total_expenses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def copy_split_members(apps, schema_editor):
+    SplitTransaction = apps.get_model('wallet', 'SplitTransaction')
+    SplitTransactionMember = apps.get_model('wallet', 'SplitTransactionMember')
+    Transaction = apps.get_model('wallet', 'Transaction')
+    members = []
+    for split in SplitTransaction.objects.prefetch_related('all_friends_involved').iterator():
+        friends = split.all_friends_involved.all()
+        if not friends:
+            continue
+        paid_amounts = dict(Transaction.objects.filter(split_expense=split).exclude(
+            category=0).values('user').annotate(total=Sum('amount')).order_by(
+        ).values_list('user', 'total'))
+        for friend in friends:
+            members.append(SplitTransactionMember(split_id=split.id,
+                                                  user_id=friend.id,
+                                                  required_amount=split.total_amount // len(friends),
+                                                  paid_amount=paid_amounts.get(friend.id, 0)))
+    SplitTransactionMember.objects.bulk_create(members, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('wallet', '0003_cashaccount_total_expenses'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SplitTransactionMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('required_amount', models.IntegerField(default=0)),
+                ('paid_amount', models.IntegerField(default=0)),
+                ('split', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='wallet.splittransaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('split', 'user')},
+            },
+        ),
+        migrations.RunPython(copy_split_members, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='splittransaction',
+            name='all_friends_involved',
+        ),
+        migrations.AddField(
+            model_name='splittransaction',
+            name='all_friends_involved',
+            field=models.ManyToManyField(related_name='involved_friends', through='wallet.SplitTransactionMember', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0004_splittransactionmember'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monthlytransactionsummary',
+            index=models.Index(fields=['user', 'year', 'month'], name='summary_user_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'scheduled', 'transaction_time'], name='transaction_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['scheduled', 'transaction_time'], name='transaction_scheduled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'split_expense'], name='transaction_user_split_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import wallet.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('wallet', '0005_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_date', models.DateField()),
+                ('to_date', models.DateField()),
+                ('report_type', models.CharField(max_length=10)),
+                ('data_version', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('file', models.FileField(blank=True, storage=wallet.models.get_report_storage, upload_to='transactions/')),
+                ('creation_time', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='transactionreport',
+            index=models.Index(fields=['user', 'from_date', 'to_date', 'report_type', 'data_version'], name='report_cache_key_idx'),
+        ),
+    ]
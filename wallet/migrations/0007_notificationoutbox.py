@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:15
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0006_transactionreport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.PositiveSmallIntegerField()),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('dedupe_key', models.CharField(db_index=True, max_length=100)),
+                ('creation_time', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:17
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0007_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationDigestEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('sms', 'Sms')], max_length=10)),
+                ('recipient', models.CharField(max_length=254)),
+                ('notification_type', models.PositiveSmallIntegerField()),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('creation_time', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notificationdigestentry',
+            index=models.Index(fields=['channel', 'recipient', 'creation_time'], name='digest_recipient_idx'),
+        ),
+    ]
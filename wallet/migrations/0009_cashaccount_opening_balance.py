@@ -0,0 +1,37 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:20
+
+from django.db import migrations, models
+from django.db.models import Case, F, Sum, When
+
+
+def compute_opening_balances(apps, schema_editor):
+    """
+        takes the current balances as correct, any drift so far becomes part of the baseline
+    """
+    CashAccount = apps.get_model('wallet', 'CashAccount')
+    Transaction = apps.get_model('wallet', 'Transaction')
+    account_totals = dict(Transaction.objects.filter(scheduled=False).values(
+        'cash_account').annotate(total=Sum(Case(When(category=0, then=F('amount')),
+                                                default=-F('amount')))
+                                 ).order_by().values_list('cash_account', 'total'))
+    accounts = []
+    for account in CashAccount.objects.only('id', 'balance').iterator():
+        account.opening_balance = account.balance - account_totals.get(account.id, 0)
+        accounts.append(account)
+    CashAccount.objects.bulk_update(accounts, ['opening_balance'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0008_notificationdigestentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cashaccount',
+            name='opening_balance',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(compute_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+def record_current_balances(apps, schema_editor):
+    """
+        opens the ledger of every existing account with its current balance
+    """
+    CashAccount = apps.get_model('wallet', 'CashAccount')
+    LedgerEntry = apps.get_model('wallet', 'LedgerEntry')
+    entries = []
+    for account_id, balance in CashAccount.objects.exclude(balance=0).values_list(
+            'id', 'balance').iterator():
+        group = uuid.uuid4()
+        entries.append(LedgerEntry(group=group, cash_account_id=account_id, amount=balance))
+        entries.append(LedgerEntry(group=group, cash_account_id=None, amount=-balance))
+    LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0009_cashaccount_opening_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.IntegerField()),
+                ('last_entry_id', models.BigIntegerField()),
+                ('creation_time', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cash_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='wallet.cashaccount')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.UUIDField(db_index=True)),
+                ('amount', models.IntegerField()),
+                ('category', models.IntegerField(blank=True, choices=[(0, 'Income'), (1, 'Drink'), (2, 'Fuel'), (3, 'Healthcare'), (4, 'Travel'), (5, 'Food'), (6, 'Grocery'), (7, 'Other')], null=True)),
+                ('creation_time', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cash_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='wallet.cashaccount')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ledgersnapshot',
+            index=models.Index(fields=['cash_account', 'last_entry_id'], name='snapshot_account_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['cash_account', 'id'], name='ledger_account_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['creation_time'], name='ledger_time_idx'),
+        ),
+        migrations.RunPython(record_current_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0013_ledgerentry_transaction'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='monthlytransactionsummary',
+            name='summary_user_month_idx',
+        ),
+        migrations.AddIndex(
+            model_name='monthlytransactionsummary',
+            index=models.Index(fields=['user', 'year', 'month', 'cash_account', 'category'], name='summary_user_month_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib import admin
 from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.serializers.json import DjangoJSONEncoder
 
 from django.utils.timezone import now
 
@@ -11,16 +13,16 @@ class CashAccount(models.Model):
     balance = models.IntegerField(default=0)
     limit = models.IntegerField(default=0)
     creation_time = models.DateTimeField(auto_now=True)
+    total_expenses = models.IntegerField(default=0)
+    # balance before any transaction, the baseline balance reconciliation starts from
+    opening_balance = models.IntegerField(default=0)
 
     class Meta:
         unique_together = ['user', 'title']
 
     @admin.display(description='Total Expenses')
     def get_expenses(self):
-        transactions = Transaction.objects.filter(cash_account=self, scheduled=False)
-        transaction_expenses = transactions.exclude(category=TransactionCategories.Income)
-        expenses = [transaction.amount for transaction in transaction_expenses]
-        return sum(expenses)
+        return self.total_expenses
 
 
 class TransactionCategories (models.IntegerChoices):
@@ -46,6 +48,7 @@ class SplitTransaction (models.Model):
                                       on_delete=models.CASCADE,
                                       related_name='paying_user')
     all_friends_involved = models.ManyToManyField(to=settings.AUTH_USER_MODEL,
+                                                  through='SplitTransactionMember',
                                                   related_name='involved_friends')
 
     @admin.display(description="Friends Involved")
@@ -57,12 +60,29 @@ class SplitTransaction (models.Model):
         return self.friends_paid.all()
 
 
+class SplitTransactionMember(models.Model):
+    split = models.ForeignKey(to=SplitTransaction, on_delete=models.CASCADE,
+                              related_name='members')
+    user = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    required_amount = models.IntegerField(default=0)
+    paid_amount = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['split', 'user']
+
+    def get_payable_amount(self):
+        payable = self.required_amount - self.paid_amount
+        return payable if payable > 0 else 0
+
+
 class Transaction(models.Model):
     title = models.CharField(max_length=120)
     user = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     cash_account = models.ForeignKey(to=CashAccount, on_delete=models.CASCADE)
     transaction_time = models.DateTimeField(default=now)
     scheduled = models.BooleanField(default=False)
+    # bumped by every write, queryset updates have to set it themselves
+    updated_at = models.DateTimeField(auto_now=True)
 
     category = models.IntegerField(choices=TransactionCategories.choices)
     amount = models.IntegerField(default=0)
@@ -70,3 +90,132 @@ class Transaction(models.Model):
     split_expense = models.ForeignKey(to=SplitTransaction,
                                       on_delete=models.CASCADE,
                                       blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'scheduled', 'transaction_time'],
+                         name='transaction_user_time_idx'),
+            models.Index(fields=['scheduled', 'transaction_time'],
+                         name='transaction_scheduled_idx'),
+            models.Index(fields=['user', 'split_expense'],
+                         name='transaction_user_split_idx'),
+        ]
+
+
+class MonthlyTransactionSummary(models.Model):
+    user = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    cash_account = models.ForeignKey(to=CashAccount, on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    category = models.IntegerField(choices=TransactionCategories.choices)
+    total_amount = models.IntegerField(default=0)
+    transaction_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'cash_account', 'year', 'month', 'category']
+        indexes = [
+            # cash_account and category follow so the category chart groups in index order
+            models.Index(fields=['user', 'year', 'month', 'cash_account', 'category'],
+                         name='summary_user_month_idx'),
+        ]
+
+
+def get_report_storage():
+    return FileSystemStorage(location=settings.REPORTS_ROOT)
+
+
+class ReportStatus(models.TextChoices):
+    Pending = 'pending'
+    Ready = 'ready'
+    Failed = 'failed'
+
+
+class TransactionReport(models.Model):
+    user = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    from_date = models.DateField()
+    to_date = models.DateField()
+    report_type = models.CharField(max_length=10)
+    data_version = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=ReportStatus.choices,
+                              default=ReportStatus.Pending)
+    file = models.FileField(storage=get_report_storage, upload_to='transactions/', blank=True)
+    creation_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'from_date', 'to_date', 'report_type', 'data_version'],
+                         name='report_cache_key_idx'),
+        ]
+
+
+class NotificationOutbox(models.Model):
+    """
+        notifications written in the same database transaction as the change they announce,
+        dispatched in batches by the drain_notification_outbox task
+    """
+    notification_type = models.PositiveSmallIntegerField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    dedupe_key = models.CharField(max_length=100, db_index=True)
+    creation_time = models.DateTimeField(auto_now_add=True)
+
+
+class NotificationChannel(models.TextChoices):
+    Email = 'email'
+    SMS = 'sms'
+
+
+class NotificationDigestEntry(models.Model):
+    """
+        a built email or sms waiting to be merged with the other notifications of its recipient
+        into one digest message
+    """
+    channel = models.CharField(max_length=10, choices=NotificationChannel.choices)
+    recipient = models.CharField(max_length=254)
+    notification_type = models.PositiveSmallIntegerField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    creation_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['channel', 'recipient', 'creation_time'],
+                         name='digest_recipient_idx'),
+        ]
+
+
+class LedgerEntry(models.Model):
+    """
+        append only record of money movements, every movement is one group of entries whose
+        amounts sum to zero. the leg without a cash account is the world outside the app,
+        entries of a deleted account are kept and join it so every movement stays balanced
+    """
+    group = models.UUIDField(db_index=True)
+    cash_account = models.ForeignKey(to=CashAccount, on_delete=models.SET_NULL,
+                                     blank=True, null=True)
+    amount = models.IntegerField()
+    category = models.IntegerField(choices=TransactionCategories.choices, blank=True, null=True)
+    # the transaction behind the movement, kept as a plain reference once it is deleted
+    transaction = models.ForeignKey(to=Transaction, on_delete=models.DO_NOTHING,
+                                    db_constraint=False, blank=True, null=True,
+                                    related_name='+')
+    creation_time = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cash_account', 'id'], name='ledger_account_idx'),
+            models.Index(fields=['creation_time'], name='ledger_time_idx'),
+        ]
+
+
+class LedgerSnapshot(models.Model):
+    """
+        balance of a cash account over all its ledger entries up to last_entry_id
+    """
+    cash_account = models.ForeignKey(to=CashAccount, on_delete=models.CASCADE)
+    balance = models.IntegerField()
+    last_entry_id = models.BigIntegerField()
+    creation_time = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cash_account', 'last_entry_id'], name='snapshot_account_idx'),
+        ]
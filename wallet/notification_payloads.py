@@ -0,0 +1,71 @@
+""" Hydration of the id only payloads carried by notification tasks """
+
+from accounts.models import EmailAuthenticatedUser
+from accounts.serializers import UserSerializer
+from wallet.models import SplitTransaction, Transaction
+from wallet.serializers import SplitTransactionSerializer, TransactionSerializer
+from wallet.utils import SplitTransactionUtils, TransactionUtils
+
+
+class NotificationPayloadHydrator:
+    """
+        replaces the ids in (notification type, payload) pairs with the serialized rows the
+        notification services render, every kind of row is loaded in a single query
+        payload keys: split_id -> split, user_id -> user, transaction_id -> transaction,
+        transaction_ids -> scheduled_transactions, any other key is passed through
+    """
+
+    def hydrate(self, notifications):
+        """
+        returns the hydrated pairs, notifications whose rows were deleted meanwhile are dropped
+        """
+        splits = self._get_serialized(
+            SplitTransactionUtils().with_serializer_relations(SplitTransaction.objects.all()),
+            SplitTransactionSerializer, self._collect_ids(notifications, 'split_id'))
+        users = self._get_serialized(EmailAuthenticatedUser.objects.all(), UserSerializer,
+                                     self._collect_ids(notifications, 'user_id'))
+        transactions = self._get_serialized(
+            TransactionUtils().with_serializer_relations(Transaction.objects.all()),
+            TransactionSerializer, self._collect_ids(notifications, 'transaction_id',
+                                                     'transaction_ids'))
+
+        hydrated = []
+        for notification_type, payload in notifications:
+            data = {key: value for key, value in payload.items()
+                    if key not in ('split_id', 'user_id', 'transaction_id', 'transaction_ids')}
+            try:
+                if 'split_id' in payload:
+                    data['split'] = splits[payload['split_id']]
+                if 'user_id' in payload:
+                    data['user'] = users[payload['user_id']]
+                if 'transaction_id' in payload:
+                    data['transaction'] = transactions[payload['transaction_id']]
+                if 'transaction_ids' in payload:
+                    data['scheduled_transactions'] = [
+                        transactions[transaction_id]
+                        for transaction_id in payload['transaction_ids']
+                        if transaction_id in transactions]
+                    if not data['scheduled_transactions']:
+                        continue
+            except KeyError:
+                continue
+            hydrated.append((notification_type, data))
+        return hydrated
+
+    @staticmethod
+    def _collect_ids(notifications, *keys):
+        ids = set()
+        for _, payload in notifications:
+            for key in keys:
+                if key.endswith('_ids'):
+                    ids.update(payload.get(key, []))
+                elif key in payload:
+                    ids.add(payload[key])
+        return ids
+
+    @staticmethod
+    def _get_serialized(queryset, serializer_class, ids):
+        if not ids:
+            return {}
+        return {instance.id: serializer_class(instance).data
+                for instance in queryset.filter(pk__in=ids)}
@@ -1,13 +1,27 @@
+import csv
+import tempfile
 from datetime import datetime
 
-from django.db.models import Sum
+from django.core.files import File
+from django.db.models import Count, Max, Q, Sum
 from django.template.loader import get_template
+from django.utils.timezone import localtime
 
 from wallet.models import Transaction, TransactionCategories
 from wallet.serializers import TransactionSerializer
 
 
+class EchoBuffer:
+    """
+        file like object handing every row csv.writer writes back to the caller
+    """
+
+    def write(self, value):
+        return value
+
+
 class ReportMaker:
+    csv_header = ['Date', 'Title', 'Account', 'Category', 'Amount']
 
     def __init__(self, request_data):
         self.from_date = datetime.strptime(request_data.get('from_date')[0], '%Y-%m-%d').date()
@@ -19,22 +33,76 @@ class ReportMaker:
         if self.type == 'csv':
             return self._generate_csv_report()
 
-    def _get_transactions_data(self):
-        transactions = Transaction.objects.filter(
+    def stream_report(self, chunk_size=2000):
+        """
+            returns an iterator over the report lines, holding one chunk of rows in memory
+        """
+        if self.type == 'csv':
+            return self._stream_csv_report(chunk_size)
+
+    def get_data_version(self):
+        """
+            fingerprint of the transactions in the report range, changes whenever one is
+            added, removed or written to
+        """
+        version = self._get_transactions().aggregate(
+            count=Count('id'),
+            last_id=Max('id'),
+            updated_at=Max('updated_at')
+        )
+        updated_at = version['updated_at']
+        return (f"{version['count']}-{version['last_id'] or 0}-"
+                f"{int(updated_at.timestamp() * 1000000) if updated_at else 0}")
+
+    def save_report(self, report):
+        """
+            writes the streamed report into the file of given TransactionReport
+        """
+        with tempfile.TemporaryFile() as report_file:
+            for line in self.stream_report():
+                report_file.write(line.encode())
+            report.file.save(f'{report.user_id}_{self.from_date}_{self.to_date}_'
+                             f'{report.data_version}.{self.type}', File(report_file), save=False)
+
+    def _get_transactions(self):
+        return Transaction.objects.filter(
             user=self.user_id,
             transaction_time__range=(self.from_date, self.to_date),
         )
-        total_deposit = transactions.filter(category=TransactionCategories.Income.value
-                                            ).aggregate(Sum('amount'))['amount__sum']
-        total_withdrawal = transactions.exclude(category=TransactionCategories.Income.value
-                                                ).aggregate(Sum('amount'))['amount__sum']
+
+    def _get_totals(self, transactions):
+        income = TransactionCategories.Income.value
+        return transactions.aggregate(
+            total_deposit=Sum('amount', filter=Q(category=income)),
+            total_withdrawal=Sum('amount', filter=~Q(category=income))
+        )
+
+    def _get_transactions_data(self):
+        transactions = self._get_transactions()
+        totals = self._get_totals(transactions)
         transactions = TransactionSerializer(transactions, many=True).data
-        return {'transactions': transactions,
-                'total_deposit': total_deposit,
-                'total_withdrawal': total_withdrawal}
+        return {'transactions': transactions, **totals}
 
     def _generate_csv_report(self):
         report_data = self._get_transactions_data()
         csv_template = get_template('reports/transactionReportTemplate.txt')
-        csv = csv_template.render(report_data)
-        return csv
+        csv_report = csv_template.render(report_data)
+        return csv_report
+
+    def _stream_csv_report(self, chunk_size):
+        writer = csv.writer(EchoBuffer(), quoting=csv.QUOTE_ALL)
+        category_labels = dict(TransactionCategories.choices)
+        transactions = self._get_transactions()
+
+        yield writer.writerow(self.csv_header)
+        rows = transactions.order_by('transaction_time', 'id').values_list(
+            'transaction_time', 'title', 'cash_account__title', 'category', 'amount')
+        for transaction_time, title, account_title, category, amount in rows.iterator(
+                chunk_size=chunk_size):
+            yield writer.writerow([localtime(transaction_time).isoformat(), title, account_title,
+                                   category_labels[category], amount])
+
+        totals = self._get_totals(transactions)
+        yield writer.writerow([])
+        yield writer.writerow(['Total Deposit', totals['total_deposit'] or 0])
+        yield writer.writerow(['Total Withdrawal', totals['total_withdrawal'] or 0])
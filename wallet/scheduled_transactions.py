@@ -0,0 +1,95 @@
+""" Executor applying due scheduled transactions in chunks """
+
+import time
+
+from django.db import transaction as db_transaction
+from django.db.models import Value
+from django.utils.timezone import now
+
+from wallet.models import Transaction, TransactionCategories
+from wallet.utils import CashAccountUtils, LedgerUtils, TransactionSummaryUtils, \
+    TransactionUtils
+
+
+class ScheduledTransactionExecutor:
+    """
+        claims due scheduled transactions with select_for_update(skip_locked=True) so that
+        several workers can run concurrently, each chunk is applied in one database
+        transaction with one balance update per cash account
+    """
+
+    def __init__(self, due_time, chunk_size=200, on_chunk_applied=None):
+        self.due_time = due_time
+        self.chunk_size = chunk_size
+        # called with the applied and failed ids inside the database transaction of the chunk
+        self.on_chunk_applied = on_chunk_applied
+
+    def run(self):
+        """
+            returns counts of applied and failed transactions with the throughput of the run
+        """
+        applied_count, failed_count, last_id = 0, 0, 0
+        start_time = time.monotonic()
+        while True:
+            applied_ids, failed_ids, last_id = self._execute_chunk(last_id)
+            if last_id is None:
+                break
+            applied_count += len(applied_ids)
+            failed_count += len(failed_ids)
+        elapsed = time.monotonic() - start_time
+        return {'applied': applied_count,
+                'failed': failed_count,
+                'seconds': elapsed,
+                'applied_per_second': applied_count / elapsed if elapsed else 0}
+
+    def get_due_transactions(self, after_id=0):
+        # compared to a value so transaction_scheduled_idx can be searched
+        return Transaction.objects.filter(scheduled=Value(True),
+                                          transaction_time__lte=self.due_time,
+                                          pk__gt=after_id).order_by('pk')
+
+    @db_transaction.atomic
+    def _execute_chunk(self, after_id):
+        transactions = list(self.get_due_transactions(after_id).select_for_update(
+            skip_locked=True)[:self.chunk_size])
+        if not transactions:
+            return [], [], None
+
+        accounts = CashAccountUtils().lock_accounts(
+            {transaction.cash_account_id for transaction in transactions})
+        balances = {account.id: account.balance for account in accounts.values()}
+        opening_balances = dict(balances)
+
+        applied, failed_ids = [], []
+        for transaction in transactions:
+            new_balance = self._get_new_balance(balances[transaction.cash_account_id], transaction)
+            if new_balance is None:
+                failed_ids.append(transaction.id)
+                continue
+            balances[transaction.cash_account_id] = new_balance
+            applied.append(transaction)
+
+        CashAccountUtils().add_to_balances(
+            {account_id: (balance - opening_balances[account_id], 0)
+             for account_id, balance in balances.items()})
+        LedgerUtils().record_transactions(applied)
+        Transaction.objects.filter(pk__in=[transaction.id for transaction in applied]
+                                   ).update(scheduled=False, updated_at=now())
+        for transaction in applied:
+            transaction.scheduled = False
+            TransactionSummaryUtils().add_transaction(transaction)
+
+        applied_ids = [transaction.id for transaction in applied]
+        if self.on_chunk_applied:
+            self.on_chunk_applied(applied_ids, failed_ids)
+        return applied_ids, failed_ids, transactions[-1].id
+
+    def _get_new_balance(self, balance, transaction):
+        """
+            returns None when the account can not cover the expense
+        """
+        if transaction.category != TransactionCategories.Income.value and \
+                balance < transaction.amount:
+            return None
+        return TransactionUtils().get_new_account_balance(balance, transaction.amount,
+                                                          transaction.category)
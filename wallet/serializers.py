@@ -2,22 +2,45 @@ import datetime
 
 import pytz
 from django.conf import settings
+from django.db import transaction as db_transaction
+from django.urls import reverse
 from rest_framework import serializers
 
 from accounts.models import EmailAuthenticatedUser
 from accounts.serializers import UserSerializer
-from wallet.models import Transaction, CashAccount, SplitTransaction, TransactionCategories
-from wallet.utils import SplitTransactionUtils
+from wallet.models import Transaction, CashAccount, SplitTransaction, TransactionCategories, \
+    TransactionReport, ReportStatus
+from wallet.utils import CashAccountUtils, SplitTransactionUtils
 
 
 class CashAccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = CashAccount
         fields = '__all__'
+        read_only_fields = ['total_expenses', 'opening_balance']
+
+    @db_transaction.atomic
+    def create(self, validated_data):
+        validated_data['opening_balance'] = validated_data.get('balance', 0)
+        account = super().create(validated_data)
+        CashAccountUtils().record_adjustment(account.id, account.balance)
+        return account
+
+    @db_transaction.atomic
+    def update(self, instance, validated_data):
+        # balance and total_expenses only move through CashAccountUtils, saving them from this
+        # instance would overwrite transactions written since it was read
+        if 'balance' in validated_data:
+            CashAccountUtils().set_balance(instance.id, validated_data.pop('balance'))
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=[*validated_data, 'creation_time'])
+        instance.refresh_from_db(fields=['balance', 'total_expenses', 'opening_balance'])
+        return instance
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data['expenses'] = instance.get_expenses()
+        data['expenses'] = instance.total_expenses
         return data
 
 
@@ -37,9 +60,12 @@ class SplitTransactionSerializer(serializers.ModelSerializer):
         validated_data['paying_friend'] = EmailAuthenticatedUser.objects.get(
             pk=self.initial_data.get('paying_friend'))
         split = SplitTransaction.objects.create(**validated_data)
-        friends_involved = EmailAuthenticatedUser.objects.filter(
-            pk__in=[int(friend_id) for friend_id in self.initial_data.get('all_friends_involved')])
-        split.all_friends_involved.set(friends_involved)
+        friends_involved = list(EmailAuthenticatedUser.objects.filter(
+            pk__in=[int(friend_id) for friend_id in self.initial_data.get('all_friends_involved')]))
+        if friends_involved:
+            split.all_friends_involved.set(friends_involved, through_defaults={
+                'required_amount': split.total_amount // len(friends_involved)
+            })
         return split
 
     def to_representation(self, instance):
@@ -85,7 +111,7 @@ class TransactionSerializer(serializers.ModelSerializer):
             checks account have limit,
             new total expenses for account < account limit
         """
-        if account.limit != 0 and (account.get_expenses() + amount > account.limit):
+        if account.limit != 0 and (account.total_expenses + amount > account.limit):
             raise serializers.ValidationError('You are exceeding your budget')
 
     def _validate_account_balance(self, account, amount):
@@ -105,7 +131,7 @@ class TransactionSerializer(serializers.ModelSerializer):
             checks if account balance after income transaction update < total account expenses
         """
         if (self.partial and (self.instance.cash_account.balance - self.instance.amount + amount <
-                        self.instance.cash_account.get_expenses())):
+                        self.instance.cash_account.total_expenses)):
             raise serializers.ValidationError("Expenses are more than new balance")
 
     def validate(self, attrs):
@@ -136,6 +162,18 @@ class TransactionSerializer(serializers.ModelSerializer):
         return data
 
 
+class TransactionBatchItemSerializer(serializers.Serializer):
+    """
+        field level validation of one item of a transaction batch,
+        balances and limits are checked by TransactionBatchWriter
+    """
+    title = serializers.CharField(max_length=120)
+    amount = serializers.IntegerField(min_value=1)
+    category = serializers.ChoiceField(choices=TransactionCategories.choices)
+    cash_account = serializers.IntegerField()
+    transaction_time = serializers.DateTimeField(required=False)
+
+
 class ScheduledTransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
@@ -164,3 +202,16 @@ class ScheduledTransactionSerializer(serializers.ModelSerializer):
 class MaxSplitsDueSerializer(serializers.Serializer):
     payable_amount = serializers.IntegerField()
     split = SplitTransactionSerializer(read_only=True)
+
+
+class TransactionReportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TransactionReport
+        fields = ['id', 'from_date', 'to_date', 'report_type', 'status', 'creation_time']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['status_url'] = reverse('wallet:transaction_report', args=[instance.id])
+        data['download_url'] = reverse('wallet:transaction_report_download', args=[instance.id]) \
+            if instance.status == ReportStatus.Ready else None
+        return data
@@ -1,17 +1,38 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from django.conf import settings
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from twilio.base.exceptions import TwilioRestException
+from django.utils.timezone import localtime
+
+from budget_tracker.mailer import BulkEmailSender
+from budget_tracker.push import send_push_notification_batch
+from budget_tracker.sms import SMSSender
+from wallet.models import NotificationChannel
+from wallet.utils import NotificationDigestUtils
 
 
 class EmailNotification:
     budget_tracker_link = settings.FRONTEND_URL
 
     def notify(self, data, notification_type):
-        notification = self._select_notification(notification_type)
-        self._send_email_notification(notification(data))
+        self.notify_many([(notification_type, data)])
+
+    def notify_many(self, notifications):
+        """
+        sends every (notification type, data) pair over one connection, types sent as digests
+        are held back per recipient instead
+        """
+        emails_data, digest_entries = [], []
+        for notification_type, data in notifications:
+            email_data = self._select_notification(notification_type)(data)
+            if Notification.is_digested(notification_type):
+                recipients = email_data.pop('recipient_list')
+                digest_entries += [(NotificationChannel.Email, recipient, notification_type,
+                                    email_data) for recipient in recipients]
+            else:
+                emails_data.append(email_data)
+        NotificationDigestUtils().add_many(digest_entries)
+        BulkEmailSender().send(emails_data)
+
+    def build_digests(self, digests):
+        return [self._for_digest(recipient, entries) for recipient, entries in digests]
 
     def _select_notification(self, notification_type):
         if notification_type == Notification.SPLIT_INCLUDE_NOTIFICATION:
@@ -22,17 +43,11 @@ class EmailNotification:
             return self._for_scheduled_transaction_report
         elif notification_type == Notification.DAILY_SCHEDULED_REPORT:
             return self._for_daily_scheduled_report
+        elif notification_type == Notification.DIGEST:
+            return self._for_built_digest
 
-    def _send_email_notification(self, email_data):
-        html_message = render_to_string(template_name=email_data["template"],
-                                        context=email_data["context"]
-                                        )
-        send_mail(subject=email_data["subject"],
-                  message=email_data["message"],
-                  html_message=html_message,
-                  recipient_list=email_data["recipient_list"],
-                  from_email=settings.SENDER_EMAIL
-                  )
+    def _for_built_digest(self, data):
+        return data
 
     def _for_split_include_notification(self, data):
         context = {
@@ -90,6 +105,23 @@ class EmailNotification:
                 'recipient_list': [data["transaction"]["user"]["email"]]
                 }
 
+    def _for_digest(self, recipient, entries):
+        if len(entries) == 1:
+            return {**entries[0].payload, 'recipient_list': [recipient]}
+        context = {
+            'notifications': [{'time': localtime(entry.creation_time).strftime('%d %b %H:%M'),
+                               'subject': entry.payload['subject']} for entry in entries],
+            'button_text': 'View More',
+            'button_link': self.budget_tracker_link
+        }
+        title = f'{len(entries)} new notifications on BudgetTracker'
+        return {'template': 'emails/notificationDigestTemplate.html',
+                'context': context,
+                'subject': title,
+                'message': '\n'.join(entry.payload['subject'] for entry in entries),
+                'recipient_list': [recipient]
+                }
+
     def _for_daily_scheduled_report(self, data):
         context = {**data, 'button_text': 'View More', 'button_link': self.budget_tracker_link}
         title = f"Transactions Scheduled for Today {data['curr_date']}"
@@ -103,8 +135,44 @@ class EmailNotification:
 
 class SMSNotification:
     def notify(self, data, notification_type):
-        notification = self._select_notification(notification_type)
-        notification(data)
+        self.notify_many([(notification_type, data)])
+
+    def notify_many(self, notifications):
+        """
+        sends the messages of every (notification type, data) pair in one concurrent fan-out,
+        types sent as digests are held back per recipient instead
+        """
+        messages, digest_entries = [], []
+        for notification_type, data in notifications:
+            notification = self._select_notification(notification_type)
+            if notification is None:
+                continue
+            if Notification.is_digested(notification_type):
+                digest_entries += [(NotificationChannel.SMS, recipient_phone, notification_type,
+                                    {'message': message})
+                                   for message, recipient_phone in notification(data)]
+            else:
+                messages += notification(data)
+        NotificationDigestUtils().add_many(digest_entries)
+        self._send_sms_notifications(messages)
+
+    def build_digests(self, digests):
+        return [{'message': self._for_digest(entries), 'phone': recipient}
+                for recipient, entries in digests]
+
+    def _send_sms_notifications(self, messages):
+        SMSSender().send_many([(f'{message}\nFrom BudgetTracker', recipient_phone)
+                               for message, recipient_phone in messages])
+
+    def _for_digest(self, entries):
+        if len(entries) == 1:
+            return entries[0].payload['message']
+        lines = [entry.payload['message'].split('\n')[0]
+                 for entry in entries[:settings.SMS_DIGEST_MAX_LINES]]
+        message = f'{len(entries)} new notifications:\n' + '\n'.join(lines)
+        if len(entries) > len(lines):
+            message += f'\nand {len(entries) - len(lines)} more'
+        return message
 
     def _select_notification(self, notification_type):
         if notification_type == Notification.SPLIT_INCLUDE_NOTIFICATION:
@@ -113,51 +181,45 @@ class SMSNotification:
             return self._for_split_payment_notification
         elif notification_type == Notification.SCHEDULED_TRANSACTION_COMPLETION:
             return self._for_scheduled_transaction_report
+        elif notification_type == Notification.DIGEST:
+            return self._for_built_digest
 
-    def _send_sms_notification(self, message, recipient_phone):
-        message += '\nFrom BudgetTracker'
-        try:
-            settings.TWILIO_CLIENT.messages.create(
-                body=message,
-                from_=settings.PHN_NUM,
-                to=recipient_phone
-            )
-        except TwilioRestException:
-            print(TwilioRestException)
+    def _for_built_digest(self, data):
+        return [(data['message'], data['phone'])]
 
     def _for_split_include_notification(self, data):
         message = f'You have been added to a split expense ' \
                   f'for {data["split"]["title"]} by {data["split"]["creator"]["username"]}.' \
                   f'\nAmount Paid by {data["split"]["paying_friend"]["username"]}: ' \
                   f'{data["split"]["total_amount"]}'
-        for friend in data["split"]["all_friends_involved"]:
-            self._send_sms_notification(
-                message=message,
-                recipient_phone=friend["phone_number"]
-            )
+        return [(message, friend["phone_number"])
+                for friend in data["split"]["all_friends_involved"]]
 
     def _for_split_payment_notification(self, data):
 
         message = f'Payment amount {data["payment"]} for {data["split"]["title"]} made by ' \
                   f'{data["user"]["username"]}, added to your cash account'
-        self._send_sms_notification(
-            message=message,
-            recipient_phone=data["split"]["paying_friend"]["phone_number"]
-        )
+        return [(message, data["split"]["paying_friend"]["phone_number"])]
 
     def _for_scheduled_transaction_report(self, data):
         message = f'Scheduled Transaction for {data["transaction"]["title"]} has {data["status"]}' \
                   f'\nTransaction Amount: {data["transaction"]["amount"]}'
-        self._send_sms_notification(
-            message=message,
-            recipient_phone=data["transaction"]["user"]["phone_number"]
-        )
+        return [(message, data["transaction"]["user"]["phone_number"])]
 
 
 class PushNotification:
     def notify(self, data, notification_type):
-        notification = self._select_notification(notification_type)
-        notification(data)
+        self.notify_many([(notification_type, data)])
+
+    def notify_many(self, notifications):
+        """
+        sends the messages of every (notification type, data) pair in one channel layer pass
+        """
+        send_push_notification_batch([
+            self._select_notification(notification_type)(data)
+            for notification_type, data in notifications
+            if self._select_notification(notification_type)
+        ])
 
     def _select_notification(self, notification_type):
         if notification_type == Notification.SPLIT_INCLUDE_NOTIFICATION:
@@ -167,41 +229,22 @@ class PushNotification:
         elif notification_type == Notification.SCHEDULED_TRANSACTION_COMPLETION:
             return self._for_scheduled_transaction_report
 
-    def _send_push_notification(self, message, group_name):
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                "type": "send_notification",
-                "notification": message,
-            },
-        )
-
     def _for_split_include_notification(self, data):
         message = f'You have been added to a split expense for {data["split"]["title"]} by ' \
                   f'{data["split"]["creator"]["username"]}.'
-        for friend in data.get("split")["all_friends_involved"]:
-            self._send_push_notification(
-                message=message,
-                group_name=f'notification_{friend["id"]}'
-            )
+        return message, [f'notification_{friend["id"]}'
+                         for friend in data["split"]["all_friends_involved"]]
 
     def _for_split_payment_notification(self, data):
 
         message = f'Payment amount {data["payment"]} for split "{data["split"]["title"]}" made '\
                   f'by {data["user"]["username"]}, added to your cash account'
-        self._send_push_notification(
-            message=message,
-            group_name=f'notification_{data["split"]["paying_friend"]["id"]}'
-        )
+        return message, [f'notification_{data["split"]["paying_friend"]["id"]}']
 
     def _for_scheduled_transaction_report(self, data):
         message = f'Scheduled Transaction for {data["transaction"]["title"]} has {data["status"]}' \
                   f' \nTransaction Amount: {data["transaction"]["amount"]}'
-        self._send_push_notification(
-            message=message,
-            group_name=f'notification_{data["transaction"]["user"]["id"]}'
-        )
+        return message, [f'notification_{data["transaction"]["user"]["id"]}']
 
 
 class Notification:
@@ -209,6 +252,12 @@ class Notification:
     SPLIT_PAYMENT_NOTIFICATION = 1
     SCHEDULED_TRANSACTION_COMPLETION = 2
     DAILY_SCHEDULED_REPORT = 3
+    # an email or sms digest already built from held back notifications
+    DIGEST = 4
+    # email and sms of these types are merged per recipient within NOTIFICATION_DIGEST_WINDOW,
+    # push is always sent right away
+    DIGEST_TYPES = (SPLIT_INCLUDE_NOTIFICATION, SPLIT_PAYMENT_NOTIFICATION,
+                    SCHEDULED_TRANSACTION_COMPLETION)
 
     def __init__(self):
         self._email_service = EmailNotification()
@@ -220,9 +269,33 @@ class Notification:
         self._push_notification_service.notify(data, notification_type)
         self._sms_service.notify(data, notification_type)
 
+    @staticmethod
+    def is_digested(notification_type):
+        return bool(settings.NOTIFICATION_DIGEST_WINDOW) and \
+            notification_type in Notification.DIGEST_TYPES
+
+    def build_digests(self, digests):
+        """
+        digests map each channel to (recipient, digest entries) pairs,
+        returns the email and the sms digest notifications
+        """
+        return ([(Notification.DIGEST, email_data) for email_data in
+                 self._email_service.build_digests(digests[NotificationChannel.Email])],
+                [(Notification.DIGEST, sms_data) for sms_data in
+                 self._sms_service.build_digests(digests[NotificationChannel.SMS])])
+
     def notify_email(self, notification_type, data):
         self._email_service.notify(data, notification_type)
 
+    def notify_email_many(self, notifications):
+        self._email_service.notify_many(notifications)
+
+    def notify_sms_many(self, notifications):
+        self._sms_service.notify_many(notifications)
+
+    def notify_push_many(self, notifications):
+        self._push_notification_service.notify_many(notifications)
+
     def notify_sms(self, notification_type, data):
         self._sms_service.notify(data, notification_type)
 
@@ -1,16 +1,27 @@
 """ Tasks module for Celery Tasks """
 
 import datetime
+from itertools import groupby
+from operator import itemgetter
 
 import pytz
-from celery import shared_task
+from celery import group, shared_task
+from celery.utils.time import get_exponential_backoff_interval
 from django.conf import settings
+from django.db.models import F, Value, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.utils.timezone import now
+from redis.exceptions import RedisError
 
-from accounts.models import EmailAuthenticatedUser as User
-from wallet.models import Transaction, TransactionCategories
-from wallet.serializers import TransactionSerializer
+from budget_tracker.sms import SMSDeliveryError, SMSSender
+from wallet.models import ReportStatus, Transaction, TransactionReport
+from wallet.notification_payloads import NotificationPayloadHydrator
+from wallet.report_maker import ReportMaker
+from wallet.scheduled_transactions import ScheduledTransactionExecutor
 from wallet.services import Notification
-from wallet.exceptions import AccountBalanceLimitException
+from wallet.utils import CashAccountUtils, LedgerUtils, NotificationDigestUtils, \
+    NotificationOutboxUtils, TransactionReportUtils
 
 
 def get_tz_aware_current_time():
@@ -22,62 +33,126 @@ def get_tz_aware_current_time():
     return curr_time
 
 
-def get_scheduled_transactions_due():
+@shared_task
+def update_scheduled_transactions():
     """
-    returns scheduled transactions from database
+    celery task to complete the scheduled transactions
     """
-    curr_time = get_tz_aware_current_time()
-    scheduled_transactions = Transaction.objects.filter(scheduled=True,
-                                                        transaction_time__lte=
-                                                        curr_time)
-    return scheduled_transactions
-
-
-def update_account(scheduled_transaction):
-    """
-    returns: True when account updated successfully, else False
-    """
-    cash_account = scheduled_transaction.cash_account
-    if scheduled_transaction.category == TransactionCategories.Income.value:
-        cash_account.balance += scheduled_transaction.amount
-    else:
-        if cash_account.balance < scheduled_transaction.amount:
-            Notification().notify_all(notification_type=
-                                      Notification.SCHEDULED_TRANSACTION_COMPLETION,
-                                      data={
-                                          'transaction': scheduled_transaction,
-                                          'status': 'Failed'
-                                      }
-                                      )
-            raise AccountBalanceLimitException(scheduled_transaction.user.username)
-        cash_account.balance -= scheduled_transaction.amount
-    cash_account.save()
-    return True
+    result = ScheduledTransactionExecutor(
+        due_time=get_tz_aware_current_time(),
+        on_chunk_applied=queue_scheduled_transaction_notifications
+    ).run()
+    print(f"Applied {result['applied']} scheduled transactions "
+          f"({result['failed']} failed) at {result['applied_per_second']:.1f} per second")
+    return result
+
+
+def queue_scheduled_transaction_notifications(applied_ids, failed_ids):
+    """
+    adds the outcome notifications of a chunk of scheduled transactions to the outbox
+    """
+    NotificationOutboxUtils().add_many([
+        (Notification.SCHEDULED_TRANSACTION_COMPLETION,
+         {'transaction_id': transaction_id, 'status': status},
+         f'scheduled_transaction:{transaction_id}')
+        for transaction_ids, status in ((applied_ids, 'Succeeded'), (failed_ids, 'Failed'))
+        for transaction_id in transaction_ids
+    ])
 
 
 @shared_task
-def update_scheduled_transactions():
+def drain_notification_outbox():
     """
-    celery task to complete the scheduled transactions
+    celery beat task dispatching queued notifications in batches, one task per channel per batch
+    """
+    drained = 0
+    while True:
+        claimed = NotificationOutboxUtils().drain_batch(
+            dispatch_notifications, batch_size=settings.NOTIFICATION_OUTBOX_BATCH_SIZE)
+        if not claimed:
+            return drained
+        drained += claimed
+
+
+@shared_task
+def send_notification_digests():
+    """
+    celery beat task merging the held back email and sms of each recipient into one message
+    once the oldest of them is NOTIFICATION_DIGEST_WINDOW seconds old
+    """
+    sent = 0
+    while True:
+        claimed = NotificationDigestUtils().flush_due_batch(
+            dispatch_digests, window=settings.NOTIFICATION_DIGEST_WINDOW,
+            batch_size=settings.EMAIL_BATCH_SIZE)
+        if not claimed:
+            return sent
+        sent += claimed
+
+
+@shared_task
+def reconcile_account_balances():
+    """
+    celery beat task reporting cash accounts whose balance drifted from their transactions or
+    from their ledger, the drift is repaired when BALANCE_RECONCILIATION_REPAIR is set
+    """
+    drifted_accounts = CashAccountUtils().get_balance_drift()
+    for account, expected in drifted_accounts:
+        print(f'Cash Account {account.id} balance {account.balance}, expected {expected}')
+    if drifted_accounts and settings.BALANCE_RECONCILIATION_REPAIR:
+        CashAccountUtils().repair_balance_drift(drifted_accounts)
+
+    ledger_drifted_accounts = CashAccountUtils().get_ledger_drift()
+    for account, ledger_balance in ledger_drifted_accounts:
+        print(f'Cash Account {account.id} balance {account.balance}, ledger {ledger_balance}')
+    if ledger_drifted_accounts and settings.BALANCE_RECONCILIATION_REPAIR:
+        CashAccountUtils().repair_ledger_drift(ledger_drifted_accounts)
+    return len(drifted_accounts) + len(ledger_drifted_accounts)
+
+
+@shared_task
+def take_ledger_snapshots():
+    """
+    celery beat task snapshotting the balance of every cash account with new ledger entries,
+    so balances are summed from the latest snapshot instead of the whole ledger
+    """
+    return LedgerUtils().take_snapshots(lag=settings.LEDGER_SNAPSHOT_LAG)
+
+
+def dispatch_digests(digests):
+    """
+    hands the built digests to the email and sms queues, so they are sent with the retry
+    policy of their channel and outside the transaction claiming them
+    """
+    email_digests, sms_digests = Notification().build_digests(digests)
+    if email_digests:
+        send_email_notification_batch.delay(email_digests)
+    if sms_digests:
+        send_sms_notification_batch.delay(sms_digests)
+
+
+def dispatch_notifications(notifications):
+    for channel_task in (send_push_notification_batch, send_email_notification_batch,
+                         send_sms_notification_batch):
+        channel_task.delay(notifications)
+
+
+def get_first_scheduled_transactions_due(due_before, per_user=10):
+    """
+    returns the first scheduled transactions due before given time for every user,
+    ranked in one windowed query partitioned by user
     """
-    scheduled_transactions = get_scheduled_transactions_due()
-    for transaction in scheduled_transactions:
-        try:
-            update_account(transaction)
-        except AccountBalanceLimitException:
-            print(AccountBalanceLimitException)
-            continue
-
-        transaction.scheduled = False
-        transaction.save()
-        send_all_notification.delay(
-            notification_type=Notification.SCHEDULED_TRANSACTION_COMPLETION,
-            data={
-                'transaction': TransactionSerializer(transaction).data,
-                'status': 'Succeeded'
-            }
-        )
-        print("Transaction Completed")
+    ranked_transactions = Transaction.objects.filter(
+        scheduled=Value(True), transaction_time__lt=due_before
+    ).annotate(due_rank=Window(expression=RowNumber(),
+                               partition_by=[F('user')],
+                               order_by=[F('transaction_time').asc(), F('id').asc()])
+               ).values('id', 'due_rank')
+    ranked_sql, ranked_params = ranked_transactions.query.sql_with_params()
+    first_due_ids = RawSQL(f'SELECT ranked.id FROM ({ranked_sql}) ranked '
+                           f'WHERE ranked.due_rank <= %s', (*ranked_params, per_user))
+    return Transaction.objects.filter(id__in=first_due_ids).order_by('user', 'transaction_time',
+                                                                     'id')
 
 
 @shared_task
@@ -87,52 +162,142 @@ def send_daily_scheduled_transactions_email_reports():
     """
     curr_time = get_tz_aware_current_time()
     curr_date = curr_time.date()
-    users = User.objects.all()
-    for user in users:
-        scheduled_transactions = Transaction.objects.filter(user=user,
-                                                            scheduled=True,
-                                                            transaction_time__date__lte=curr_date
-                                                            )[:10]
-        if scheduled_transactions:
-            scheduled_transactions = list(
-                TransactionSerializer(scheduled_transactions, many=True
-                                      ).data)
-            send_email_notification.delay(
-                notification_type=Notification.DAILY_SCHEDULED_REPORT,
-                data={
-                    'scheduled_transactions': scheduled_transactions,
-                    'curr_date': curr_date
-                }
-            )
+    next_day_start = curr_time.replace(hour=0, minute=0, second=0, microsecond=0
+                                       ) + datetime.timedelta(days=1)
+    scheduled_transactions = get_first_scheduled_transactions_due(
+        due_before=next_day_start).values_list('user_id', 'id')
+
+    reports_data = [
+        {
+            'transaction_ids': [transaction_id for _, transaction_id in user_transactions],
+            'curr_date': curr_date.isoformat()
+        }
+        for _, user_transactions in groupby(scheduled_transactions, key=itemgetter(0))
+    ]
+    batch_size = settings.EMAIL_BATCH_SIZE
+    report_notifications = [
+        send_email_notification_batch.s([(Notification.DAILY_SCHEDULED_REPORT, report_data)
+                                         for report_data in reports_data[start:start + batch_size]])
+        for start in range(0, len(reports_data), batch_size)
+    ]
+    if report_notifications:
+        group(report_notifications).apply_async()
 
 
 @shared_task
+def generate_transaction_report(report_id):
+    """
+    celery task writing a requested transaction report to storage
+    """
+    report = TransactionReport.objects.get(pk=report_id)
+    request_data = {'from_date': [report.from_date.isoformat()],
+                    'to_date': [report.to_date.isoformat()],
+                    'report_type': [report.report_type],
+                    'user_id': report.user_id}
+    try:
+        ReportMaker(request_data).save_report(report)
+        report.status = ReportStatus.Ready
+    except Exception as exception:  # pylint: disable=broad-except
+        # a report left pending would be handed out again for every request of its key
+        print(exception)
+        report.status = ReportStatus.Failed
+    report.save()
+
+
+@shared_task
+def delete_expired_transaction_reports():
+    """
+    celery beat task removing generated reports and their files after the retention period
+    """
+    return TransactionReportUtils().delete_expired(
+        now() - datetime.timedelta(days=settings.TRANSACTION_REPORT_RETENTION_DAYS))
+
+
+def hydrate(notifications):
+    """
+    notification tasks carry (notification type, id only payload) pairs, workers load the rows
+    """
+    return NotificationPayloadHydrator().hydrate(notifications)
+
+
+@shared_task(autoretry_for=(OSError, RedisError), retry_backoff=1, retry_backoff_max=10,
+             max_retries=3)
 def send_push_notification(notification_type, data):
     """
     celery task to send push notifications
     """
-    Notification().notify_push(notification_type, data)
+    Notification().notify_push_many(hydrate([(notification_type, data)]))
 
 
-@shared_task
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=600,
+             max_retries=5, rate_limit=settings.EMAIL_TASK_RATE_LIMIT)
 def send_email_notification(notification_type, data):
     """
     celery task to send email notifications
     """
-    Notification().notify_email(notification_type, data)
+    Notification().notify_email_many(hydrate([(notification_type, data)]))
 
 
-@shared_task
+@shared_task(autoretry_for=(OSError, RedisError), retry_backoff=1, retry_backoff_max=10,
+             max_retries=3)
+def send_push_notification_batch(notifications):
+    """
+    celery task to send push for (notification type, data) pairs in one channel layer pass
+    """
+    Notification().notify_push_many(hydrate(notifications))
+
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=600,
+             max_retries=5)
+def send_email_notification_batch(notifications):
+    """
+    celery task to send emails for (notification type, data) pairs over one connection
+    """
+    Notification().notify_email_many(hydrate(notifications))
+
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=600,
+             max_retries=5)
 def send_sms_notification(notification_type, data):
     """
         celery task to send sms notifications
         """
-    Notification().notify_sms(notification_type, data)
+    send_sms_notification_batch([(notification_type, data)])
+
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=600,
+             max_retries=5)
+def send_sms_notification_batch(notifications):
+    """
+    celery task to send sms for (notification type, data) pairs in one concurrent fan-out,
+    messages that could not be delivered are handed to send_sms_messages to be retried alone
+    """
+    try:
+        Notification().notify_sms_many(hydrate(notifications))
+    except SMSDeliveryError as delivery_error:
+        send_sms_messages.delay(delivery_error.messages)
+
+
+@shared_task(bind=True, max_retries=5)
+def send_sms_messages(self, messages):
+    """
+    celery task to send rendered (body, recipient phone) pairs, every retry carries only the
+    pairs that failed on the previous attempt
+    """
+    try:
+        SMSSender().send_many(messages)
+    except SMSDeliveryError as delivery_error:
+        raise self.retry(args=(delivery_error.messages,), exc=delivery_error,
+                         countdown=get_exponential_backoff_interval(
+                             factor=1, retries=self.request.retries, maximum=600,
+                             full_jitter=True))
 
 
 @shared_task
 def send_all_notification(notification_type, data):
     """
-        celery task to send email, sms and push
+        fans out to the push, email and sms tasks, each consumed from its own queue
     """
-    Notification().notify_all(notification_type, data)
+    for channel_task in (send_push_notification, send_email_notification,
+                         send_sms_notification):
+        channel_task.delay(notification_type, data)
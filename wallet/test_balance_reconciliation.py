@@ -0,0 +1,80 @@
+import pytest
+from django.core.management import call_command
+from django.db.models import Sum
+
+from wallet.models import CashAccount, LedgerEntry
+from wallet.utils import CashAccountUtils, LedgerUtils
+
+pytestmark = pytest.mark.django_db
+
+
+def test_balance_drift_is_reported_and_repaired(user, api_client):
+    account_id = api_client.post('/cashAccountList/', {'title': 'Cash', 'balance': 100,
+                                                       'user': user.id}).json()['id']
+    api_client.post('/expenselist/', {'title': 'Lunch', 'user': user.id,
+                                      'cash_account': account_id, 'category': 5, 'amount': 30})
+    api_client.post('/incomelist/', {'title': 'Salary', 'user': user.id,
+                                     'cash_account': account_id, 'category': 0, 'amount': 50})
+    api_client.patch(f'/cashAccount/{account_id}', {'balance': 150})
+    assert CashAccountUtils().get_balance_drift() == []
+
+    CashAccount.objects.filter(pk=account_id).update(balance=90)
+    drifted_accounts = CashAccountUtils().get_balance_drift()
+    assert [(account.id, expected) for account, expected in drifted_accounts] == [
+        (account_id, 150)]
+
+    call_command('check_account_balances', '--repair')
+    assert CashAccount.objects.get(pk=account_id).balance == 150
+    assert CashAccountUtils().get_balance_drift() == []
+
+
+def test_ledger_drift_is_reported_and_repaired(user, api_client):
+    account_id = api_client.post('/cashAccountList/', {'title': 'Cash', 'balance': 100,
+                                                       'user': user.id}).json()['id']
+    api_client.post('/expenselist/', {'title': 'Lunch', 'user': user.id,
+                                      'cash_account': account_id, 'category': 5, 'amount': 30})
+    assert LedgerUtils().take_snapshots(lag=0) == 1
+    api_client.post('/incomelist/', {'title': 'Salary', 'user': user.id,
+                                     'cash_account': account_id, 'category': 0, 'amount': 50})
+    assert CashAccountUtils().get_ledger_drift() == []
+
+    CashAccount.objects.filter(pk=account_id).update(balance=90)
+    assert [(account.id, ledger_balance)
+            for account, ledger_balance in CashAccountUtils().get_ledger_drift()] == [
+        (account_id, 120)]
+
+    call_command('check_account_balances', '--repair')
+    assert CashAccount.objects.get(pk=account_id).balance == 120
+    assert LedgerUtils().get_balance(account_id) == 120
+    assert CashAccountUtils().get_ledger_drift() == []
+
+
+def test_ledger_of_a_deleted_account_stays_balanced(user, api_client):
+    account_id = api_client.post('/cashAccountList/', {'title': 'Cash', 'balance': 100,
+                                                       'user': user.id}).json()['id']
+    api_client.post('/expenselist/', {'title': 'Lunch', 'user': user.id,
+                                      'cash_account': account_id, 'category': 5, 'amount': 30})
+
+    assert api_client.delete(f'/cashAccount/{account_id}').status_code == 204
+
+    assert LedgerEntry.objects.filter(cash_account__isnull=True).count() == 4
+    assert not LedgerEntry.objects.values('group').annotate(total=Sum('amount')).exclude(
+        total=0).exists()
+
+
+def test_expense_repair_keeps_expenses_written_after_the_check(user, api_client):
+    account_id = api_client.post('/cashAccountList/', {'title': 'Cash', 'balance': 100,
+                                                       'user': user.id}).json()['id']
+    api_client.post('/expenselist/', {'title': 'Lunch', 'user': user.id,
+                                      'cash_account': account_id, 'category': 5, 'amount': 30})
+    CashAccount.objects.filter(pk=account_id).update(total_expenses=10)
+    drifted_accounts = CashAccountUtils().get_expense_drift()
+    assert [(account.id, expected) for account, expected in drifted_accounts] == [
+        (account_id, 30)]
+
+    api_client.post('/expenselist/', {'title': 'Dinner', 'user': user.id,
+                                      'cash_account': account_id, 'category': 5, 'amount': 20})
+    CashAccountUtils().repair_expense_drift(drifted_accounts)
+
+    assert CashAccount.objects.get(pk=account_id).total_expenses == 50
+    assert not CashAccountUtils().get_expense_drift()
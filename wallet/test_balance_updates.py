@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+from rest_framework.exceptions import ValidationError
+
+from accounts.models import EmailAuthenticatedUser as User
+from wallet.models import CashAccount, Transaction, TransactionCategories
+from wallet.utils import CashAccountUtils
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(name='account')
+def fixture_account(user):
+    return CashAccount.objects.create(user=user, title='Cash', balance=100, limit=90)
+
+
+def post_expense(api_client, account, amount):
+    return api_client.post('/expenselist/', {'title': 'Lunch', 'user': account.user.id,
+                                             'cash_account': account.id, 'category': 5,
+                                             'amount': amount})
+
+
+def test_expense_writes_keep_balance_and_expenses(api_client, account):
+    expense_id = post_expense(api_client, account, 40).json()['id']
+
+    response = api_client.patch(f'/expense/{expense_id}', {'amount': 50})
+    assert response.status_code == 200
+    assert response.json()['cash_account']['balance'] == 50
+    account.refresh_from_db()
+    assert (account.balance, account.total_expenses) == (50, 50)
+    assert Transaction.objects.count() == 1
+
+    assert api_client.delete(f'/expense/{expense_id}').status_code == 204
+    account.refresh_from_db()
+    assert (account.balance, account.total_expenses) == (100, 0)
+
+
+def test_growing_expense_is_checked_by_the_balance_update(account):
+    CashAccount.objects.filter(pk=account.pk).update(balance=20, total_expenses=80)
+
+    with pytest.raises(ValidationError, match='enough Balance'):
+        CashAccountUtils().apply_transaction(account.id, TransactionCategories.Food, 30)
+    with pytest.raises(ValidationError, match='exceeding your budget'):
+        CashAccountUtils().apply_transaction(account.id, TransactionCategories.Food, 15)
+    assert CashAccountUtils().apply_transaction(account.id, TransactionCategories.Food,
+                                                10).balance == 10
+    assert CashAccountUtils().apply_transaction(account.id, TransactionCategories.Income,
+                                                -5).balance == 5
+
+
+def test_deleted_split_gives_back_every_payment(api_client, user, account):
+    friend = User.objects.create(username='friend', email='friend@example.com')
+    friend_account = CashAccount.objects.create(user=friend, title='Cash', balance=100,
+                                                opening_balance=100)
+    CashAccount.objects.filter(pk=account.pk).update(opening_balance=100, limit=0)
+    split_id = api_client.post('/splitTransactionList/', {
+        'title': 'Dinner', 'category': 5, 'total_amount': 60, 'creator': user.id,
+        'paying_friend': user.id, 'all_friends_involved': [user.id, friend.id]
+    }, format='json').json()['id']
+    friend_client = APIClient()
+    friend_client.force_authenticate(friend)
+    assert friend_client.post('/paySplit/', {'split_id': split_id, 'amount': 30}
+                              ).status_code == 200
+
+    assert api_client.delete(f'/splitTransaction/{split_id}').status_code == 204
+
+    assert CashAccountUtils().get_balance_drift() == []
+    assert list(CashAccount.objects.order_by('pk').values_list('balance', 'total_expenses')
+                ) == [(100, 0), (100, 0)]
+    assert not Transaction.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_writes_and_account_edits_keep_every_balance_update(user):
+    account = CashAccount.objects.create(user=user, title='Cash', balance=1000,
+                                         opening_balance=1000)
+    CashAccountUtils().record_adjustment(account.id, 1000)
+
+    def write(thread):
+        client = APIClient()
+        client.force_authenticate(user)
+        statuses = []
+        try:
+            for index in range(10):
+                statuses.append(post_expense(client, account, 2).status_code)
+                statuses.append(client.post('/incomelist/', {
+                    'title': 'Salary', 'user': user.id, 'cash_account': account.id,
+                    'category': TransactionCategories.Income.value, 'amount': 3}).status_code)
+                statuses.append(client.patch(f'/cashAccount/{account.id}',
+                                             {'title': f'Cash {thread} {index}'}).status_code)
+        finally:
+            connection.close()
+        return statuses
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        statuses = [status for statuses in executor.map(write, range(4)) for status in statuses]
+
+    assert set(statuses) == {200, 201}
+    account.refresh_from_db()
+    assert (account.balance, account.total_expenses) == (1000 + 40 * (3 - 2), 40 * 2)
+    assert not CashAccountUtils().get_balance_drift()
+    assert not CashAccountUtils().get_ledger_drift()
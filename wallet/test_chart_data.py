@@ -0,0 +1,109 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Q, Sum
+
+from wallet.models import CashAccount, MonthlyTransactionSummary, Transaction, \
+    TransactionCategories
+
+pytestmark = pytest.mark.django_db
+
+INCOME = TransactionCategories.Income.value
+CATEGORY_LABELS = dict(TransactionCategories.choices)
+
+
+@pytest.fixture(name='accounts')
+def fixture_accounts(user, api_client):
+    cash = CashAccount.objects.create(user=user, title='Cash', balance=1000)
+    bank = CashAccount.objects.create(user=user, title='Bank', balance=1000)
+    CashAccount.objects.create(user=user, title='Savings')
+    items = [
+        ('Salary', 500, INCOME, cash, '2021-01-05T12:00:00+05:00'),
+        ('Lunch', 20, 5, cash, '2021-01-06T12:00:00+05:00'),
+        ('Dinner', 35, 5, cash, '2021-01-31T23:30:00+05:00'),
+        ('Fuel', 40, 2, cash, '2021-01-20T12:00:00+05:00'),
+        ('Groceries', 70, 6, bank, '2021-01-07T12:00:00+05:00'),
+        ('Snacks', 15, 5, bank, '2021-01-08T12:00:00+05:00'),
+        ('Bonus', 300, INCOME, bank, '2021-03-01T00:30:00+05:00'),
+        ('Doctor', 90, 3, bank, '2021-03-02T12:00:00+05:00'),
+        ('Drinks', 25, 1, cash, '2020-12-31T23:00:00+05:00'),
+    ]
+    response = api_client.post('/transactionBatch/', {'transactions': [
+        {'title': title, 'amount': amount, 'category': category, 'cash_account': account.id,
+         'transaction_time': transaction_time}
+        for title, amount, category, account, transaction_time in items
+    ]}, format='json')
+    assert response.status_code == 200
+    assert all(result['status'] == 'created' for result in response.json()['results'])
+
+
+def get_raw_category_totals(user, year, month):
+    totals = Transaction.objects.filter(
+        user=user, scheduled=False, transaction_time__year=year, transaction_time__month=month
+    ).exclude(category=INCOME).values('cash_account__title', 'category').annotate(
+        total=Sum('amount')).order_by('cash_account', 'category')
+    data = {account.title: [] for account in CashAccount.objects.filter(user=user)}
+    for row in totals:
+        data[row['cash_account__title']].append([CATEGORY_LABELS[row['category']], row['total']])
+    return data
+
+
+def get_raw_monthly_totals(user, year):
+    totals = {row['transaction_time__month']: row for row in Transaction.objects.filter(
+        user=user, scheduled=False, transaction_time__year=year
+    ).values('transaction_time__month').annotate(
+        total_income=Sum('amount', filter=Q(category=INCOME)),
+        total_expenses=Sum('amount', filter=~Q(category=INCOME))
+    ).order_by('transaction_time__month')}
+    return {
+        'income': [totals.get(month, {}).get('total_income') for month in range(1, 13)],
+        'expense': [totals.get(month, {}).get('total_expenses') for month in range(1, 13)],
+    }
+
+
+@pytest.mark.usefixtures('accounts')
+@pytest.mark.parametrize('year,month', [(2021, 1), (2021, 3), (2020, 12), (2021, 2)])
+def test_category_expense_data_matches_the_transactions(user, api_client, year, month):
+    response = api_client.get('/categoryExpenseData', {'year': year, 'month': month})
+    assert response.status_code == 200
+    assert response.json() == get_raw_category_totals(user, year, month)
+
+
+@pytest.mark.usefixtures('accounts')
+@pytest.mark.parametrize('year', [2020, 2021, 2022])
+def test_monthly_chart_data_matches_the_transactions(user, api_client, year):
+    response = api_client.get('/monthlyTransactionChartData/', {'year': year})
+    assert response.status_code == 200
+    assert response.json() == get_raw_monthly_totals(user, year)
+
+
+@pytest.mark.usefixtures('accounts')
+def test_rebuilt_summaries_match_the_transactions(user, api_client):
+    summary_fields = ('cash_account', 'year', 'month', 'category', 'total_amount',
+                      'transaction_count')
+    summaries = set(MonthlyTransactionSummary.objects.values_list(*summary_fields))
+    MonthlyTransactionSummary.objects.all().delete()
+    assert api_client.get('/monthlyTransactionChartData/', {'year': 2021}).json() == {
+        'income': [None] * 12, 'expense': [None] * 12}
+
+    output = io.StringIO()
+    call_command('rebuild_transaction_summaries', '--batch-size', '2', stdout=output)
+
+    assert output.getvalue().strip() == f'Rebuilt {len(summaries)} monthly summaries'
+    assert set(MonthlyTransactionSummary.objects.values_list(*summary_fields)) == summaries
+    for year in (2020, 2021):
+        response = api_client.get('/monthlyTransactionChartData/', {'year': year})
+        assert response.json() == get_raw_monthly_totals(user, year)
+
+
+@pytest.mark.parametrize('url,params', [
+    ('/categoryExpenseData', {'year': 'last'}),
+    ('/categoryExpenseData', {'year': 2021, 'month': 'jan'}),
+    ('/categoryExpenseData', {'year': 2021, 'month': 13}),
+    ('/categoryExpenseData', {'year': 2021, 'month': 0}),
+    ('/monthlyTransactionChartData/', {'year': '2021.5'}),
+    ('/monthlyTransactionChartData/', {'year': -1}),
+])
+def test_chart_period_must_be_a_valid_number(api_client, url, params):
+    assert api_client.get(url, params).status_code == 400
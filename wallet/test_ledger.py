@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+import pytest
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from accounts.models import EmailAuthenticatedUser as User
+from wallet.models import CashAccount, LedgerEntry, LedgerSnapshot, SplitTransactionMember
+from wallet.utils import LedgerUtils
+
+pytestmark = pytest.mark.django_db
+
+
+def post_transaction(api_client, user, account_id, category, amount):
+    url = '/incomelist/' if category == 0 else '/expenselist/'
+    return api_client.post(url, {'title': 'Ledger', 'user': user.id,
+                                 'cash_account': account_id, 'category': category,
+                                 'amount': amount})
+
+
+def assert_balanced():
+    groups = {}
+    for group, amount in LedgerEntry.objects.values_list('group', 'amount'):
+        groups[group] = groups.get(group, 0) + amount
+    assert set(groups.values()) == {0}
+
+
+def test_every_movement_is_balanced_and_matches_account(api_client, user):
+    account_id = api_client.post('/cashAccountList/', {'title': 'Wallet', 'balance': 100,
+                                                       'user': user.id}).json()['id']
+    expense_id = post_transaction(api_client, user, account_id, 5, 30).json()['id']
+    post_transaction(api_client, user, account_id, 0, 50)
+    api_client.patch(f'/expense/{expense_id}', {'amount': 20})
+    api_client.delete(f'/expense/{expense_id}')
+    api_client.patch(f'/cashAccount/{account_id}', {'balance': 120})
+
+    assert_balanced()
+    assert LedgerUtils().get_balance(account_id) == 120
+    assert CashAccount.objects.get(pk=account_id).balance == 120
+
+
+def test_split_payment_moves_money_between_both_accounts(api_client, user):
+    friend = User.objects.create(username='friend', email='friend@example.com')
+    user_account = CashAccount.objects.create(user=user, title='Cash')
+    friend_account = CashAccount.objects.create(user=friend, title='Cash', balance=100)
+    LedgerUtils().record([(friend_account.id, 100)])
+    split_id = api_client.post('/splitTransactionList/', {
+        'title': 'Dinner', 'category': 5, 'total_amount': 0, 'creator': user.id,
+        'paying_friend': user.id, 'all_friends_involved': [user.id, friend.id]
+    }, format='json').json()['id']
+    SplitTransactionMember.objects.filter(user=friend).update(required_amount=40)
+    friend_client = APIClient()
+    friend_client.force_authenticate(friend)
+
+    response = friend_client.post('/paySplit/', {'split_id': split_id, 'amount': 40})
+
+    assert response.status_code == 200
+    payment = LedgerEntry.objects.filter(cash_account=user_account).get()
+    assert set(LedgerEntry.objects.filter(group=payment.group).values_list(
+        'cash_account', 'amount')) == {(user_account.id, 40), (friend_account.id, -40)}
+    assert LedgerUtils().get_balance(friend_account.id) == 60
+    assert CashAccount.objects.get(pk=friend_account.id).balance == 60
+
+
+def test_past_balances_are_read_from_snapshots(user):
+    account = CashAccount.objects.create(user=user, title='Cash')
+    LedgerUtils().record([(account.id, 100)])
+    LedgerEntry.objects.update(creation_time=now() - timedelta(hours=2))
+    assert LedgerUtils().take_snapshots(lag=60) == 1
+    LedgerSnapshot.objects.update(creation_time=now() - timedelta(minutes=90))
+    LedgerUtils().record([(account.id, -30)])
+    LedgerEntry.objects.filter(amount=-30).update(creation_time=now() - timedelta(minutes=30))
+    assert LedgerUtils().take_snapshots(lag=60) == 1
+    LedgerUtils().record([(account.id, 5)])
+
+    assert LedgerUtils().take_snapshots(lag=60) == 0
+    assert list(LedgerSnapshot.objects.order_by('id').values_list('balance', flat=True)) == [
+        100, 70]
+    assert LedgerUtils().get_balance(account.id) == 75
+    assert LedgerUtils().get_balance(account.id, at=now() - timedelta(hours=1)) == 100
+
+
+def test_every_transaction_is_its_own_movement(api_client, user):
+    cash = CashAccount.objects.create(user=user, title='Cash', balance=100)
+    bank = CashAccount.objects.create(user=user, title='Bank')
+    expense_id = post_transaction(api_client, user, cash.id, 5, 30).json()['id']
+    results = api_client.post('/transactionBatch/', {'transactions': [
+        {'title': 'Lunch', 'amount': 20, 'category': 5, 'cash_account': cash.id},
+        {'title': 'Fuel', 'amount': 10, 'category': 2, 'cash_account': cash.id},
+        {'title': 'Salary', 'amount': 200, 'category': 0, 'cash_account': bank.id},
+    ]}, format='json').json()['results']
+
+    assert_balanced()
+    account_entries = LedgerEntry.objects.filter(cash_account__isnull=False)
+    assert set(account_entries.values_list('cash_account', 'amount', 'category',
+                                           'transaction')) == {
+        (cash.id, -30, 5, expense_id), (cash.id, -20, 5, results[0]['id']),
+        (cash.id, -10, 2, results[1]['id']), (bank.id, 200, 0, results[2]['id'])}
+    assert LedgerEntry.objects.values('group').distinct().count() == 4
@@ -0,0 +1,39 @@
+from unittest import mock
+
+import pytest
+
+from wallet.models import NotificationChannel, NotificationDigestEntry
+from wallet.services import Notification
+from wallet.tasks import send_email_notification_batch, send_notification_digests, \
+    send_sms_notification_batch
+from wallet.utils import NotificationDigestUtils
+
+pytestmark = pytest.mark.django_db
+
+
+def test_digests_are_handed_to_the_channel_queues(settings, mailoutbox):
+    settings.NOTIFICATION_DIGEST_WINDOW = 0
+    email_data = {'template': 'emails/notificationDigestTemplate.html', 'context': {},
+                  'message': 'Dinner', 'subject': 'Dinner paid by friend'}
+    NotificationDigestUtils().add_many([
+        (NotificationChannel.Email, 'friend@example.com',
+         Notification.SPLIT_INCLUDE_NOTIFICATION, email_data),
+        (NotificationChannel.Email, 'friend@example.com',
+         Notification.SPLIT_PAYMENT_NOTIFICATION, {**email_data, 'subject': 'Lunch paid'}),
+        (NotificationChannel.SMS, '+923001234567',
+         Notification.SPLIT_PAYMENT_NOTIFICATION, {'message': 'Lunch paid'}),
+    ])
+
+    with mock.patch.object(send_email_notification_batch, 'delay') as email_delay, \
+            mock.patch.object(send_sms_notification_batch, 'delay') as sms_delay:
+        assert send_notification_digests() == 3
+    assert not NotificationDigestEntry.objects.exists()
+    assert mailoutbox == []
+
+    (email_digests,), _ = email_delay.call_args
+    (sms_digests,), _ = sms_delay.call_args
+    assert sms_digests == [(Notification.DIGEST, {'message': 'Lunch paid',
+                                                  'phone': '+923001234567'})]
+    send_email_notification_batch(email_digests)
+    assert [(mail.subject, mail.to) for mail in mailoutbox] == [
+        ('2 new notifications on BudgetTracker', ['friend@example.com'])]
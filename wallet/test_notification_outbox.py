@@ -0,0 +1,54 @@
+from unittest import mock
+
+import pytest
+
+from wallet.models import NotificationOutbox
+from wallet.services import Notification
+from wallet.tasks import drain_notification_outbox, send_email_notification_batch, \
+    send_push_notification_batch, send_sms_notification_batch
+from wallet.utils import NotificationOutboxUtils
+
+pytestmark = pytest.mark.django_db
+
+PAYMENT = Notification.SPLIT_PAYMENT_NOTIFICATION
+
+
+@pytest.fixture(name='outbox')
+def fixture_outbox():
+    NotificationOutboxUtils().add_many([
+        (PAYMENT, {'split_id': 1, 'payment': 10}, 'split_payment:1'),
+        (PAYMENT, {'split_id': 2, 'payment': 20}, 'split_payment:2'),
+        (PAYMENT, {'split_id': 1, 'payment': 15}, 'split_payment:1'),
+    ])
+
+
+@pytest.mark.usefixtures('outbox')
+def test_duplicates_are_dispatched_once():
+    dispatched = []
+
+    assert NotificationOutboxUtils().drain_batch(dispatched.append, batch_size=10) == 3
+
+    assert dispatched == [[(PAYMENT, {'split_id': 1, 'payment': 10}),
+                           (PAYMENT, {'split_id': 2, 'payment': 20})]]
+    assert not NotificationOutbox.objects.exists()
+
+
+@pytest.mark.usefixtures('outbox')
+def test_failed_dispatch_keeps_the_claimed_rows():
+    with pytest.raises(RuntimeError):
+        NotificationOutboxUtils().drain_batch(mock.Mock(side_effect=RuntimeError),
+                                              batch_size=10)
+
+    assert NotificationOutbox.objects.count() == 3
+
+
+@pytest.mark.usefixtures('outbox')
+def test_outbox_is_drained_in_batches(settings):
+    settings.NOTIFICATION_OUTBOX_BATCH_SIZE = 2
+    with mock.patch.object(send_push_notification_batch, 'delay') as push_delay, \
+            mock.patch.object(send_email_notification_batch, 'delay'), \
+            mock.patch.object(send_sms_notification_batch, 'delay'):
+        assert drain_notification_outbox() == 3
+
+    assert [len(notifications) for (notifications,), _ in push_delay.call_args_list] == [2, 1]
+    assert not NotificationOutbox.objects.exists()
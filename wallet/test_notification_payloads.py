@@ -0,0 +1,26 @@
+import pytest
+
+from wallet.models import CashAccount, Transaction, TransactionCategories
+from wallet.notification_payloads import NotificationPayloadHydrator
+from wallet.services import Notification
+from wallet.tasks import send_email_notification_batch
+
+pytestmark = pytest.mark.django_db
+
+
+def test_reports_of_deleted_scheduled_transactions_are_dropped(user, mailoutbox):
+    account = CashAccount.objects.create(user=user, title='Cash', balance=100)
+    transaction = Transaction.objects.create(
+        user=user, cash_account=account, title='Rent', amount=10, scheduled=True,
+        category=TransactionCategories.Other.value)
+    reports = [(Notification.DAILY_SCHEDULED_REPORT,
+                {'transaction_ids': [transaction.id], 'curr_date': '2021-01-01'}),
+               (Notification.DAILY_SCHEDULED_REPORT,
+                {'transaction_ids': [transaction.id + 1], 'curr_date': '2021-01-01'})]
+
+    hydrated = NotificationPayloadHydrator().hydrate(reports)
+
+    assert [[scheduled['id'] for scheduled in data['scheduled_transactions']]
+            for _, data in hydrated] == [[transaction.id]]
+    send_email_notification_batch(reports)
+    assert [mail.to for mail in mailoutbox] == [['tester@example.com']]
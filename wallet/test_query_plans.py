@@ -0,0 +1,78 @@
+import re
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from wallet import views
+from wallet.models import Transaction
+from wallet.scheduled_transactions import ScheduledTransactionExecutor
+from wallet.tasks import get_first_scheduled_transactions_due
+
+pytestmark = pytest.mark.django_db
+
+
+def get_view_queryset(view_class, user, query_params=None):
+    request = Request(APIRequestFactory().get('/', query_params or {}))
+    request.user = user
+    view = view_class(request=request, format_kwarg=None, kwargs={})
+    if hasattr(view, 'filter_queryset'):
+        return view.filter_queryset(view.get_queryset())
+    return view.get_queryset()
+
+
+def get_full_scans(queryset):
+    """
+        returns plan lines reading a whole table without an index, scans of subquery and
+        window results are not counted, understands SQLite's EXPLAIN QUERY PLAN and
+        PostgreSQL's EXPLAIN
+    """
+    plan = queryset.explain()
+    if connection.vendor == 'postgresql':
+        return [line for line in plan.splitlines() if 'Seq Scan' in line]
+    tables = connection.introspection.table_names()
+    return [line for line in plan.splitlines()
+            if 'USING' not in line and any(scanned in tables for scanned in
+                                           re.findall(r'\bSCAN (?:TABLE )?(\w+)', line))]
+
+
+def get_used_indexes(queryset):
+    """
+        returns the names of the indexes the plan searches, for SQLite and PostgreSQL
+    """
+    return {''.join(names) for names in re.findall(
+        r'USING (?:COVERING )?INDEX (\w+)|Index (?:Only )?Scan using (\w+)', queryset.explain())}
+
+
+def assert_uses_index(queryset, index_name):
+    assert get_full_scans(queryset) == []
+    assert index_name in get_used_indexes(queryset)
+
+
+@pytest.mark.parametrize('view_class,index_name', [
+    (views.ExpenseListView, 'transaction_user_time_idx'),
+    (views.IncomeListView, 'transaction_user_time_idx'),
+    (views.ScheduledTransactionListView, 'transaction_user_time_idx'),
+    (views.TransactionsWithSplit, 'transaction_user_split_idx'),
+    (views.ExpenseCategoryDataView, 'summary_user_month_idx'),
+    (views.MonthlyTransactionDataView, 'summary_user_month_idx'),
+])
+def test_view_queryset_uses_index(user, view_class, index_name):
+    assert_uses_index(get_view_queryset(view_class, user, {'month': 1}), index_name)
+
+
+def test_due_scheduled_transactions_use_index():
+    executor = ScheduledTransactionExecutor(due_time=timezone.now())
+    assert_uses_index(executor.get_due_transactions(), 'transaction_scheduled_idx')
+
+
+def test_first_due_transactions_per_user_use_index():
+    queryset = get_first_scheduled_transactions_due(timezone.now())
+    assert_uses_index(queryset, 'transaction_scheduled_idx')
+
+
+def test_split_payments_use_index(user):
+    queryset = Transaction.objects.filter(user=user, split_expense=1)
+    assert_uses_index(queryset, 'transaction_user_split_idx')
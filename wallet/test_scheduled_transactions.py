@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import pytest
+from django.utils.timezone import now
+
+from accounts.models import EmailAuthenticatedUser as User
+from wallet.models import CashAccount, Transaction, TransactionCategories
+from wallet.scheduled_transactions import ScheduledTransactionExecutor
+from wallet.tasks import get_first_scheduled_transactions_due
+from wallet.utils import CashAccountUtils
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(name='account')
+def fixture_account(user):
+    account = CashAccount.objects.create(user=user, title='Cash', balance=50, opening_balance=50)
+    CashAccountUtils().record_adjustment(account.id, 50)
+    return account
+
+
+@pytest.fixture(name='scheduled')
+def fixture_scheduled(user, account):
+    food, income = TransactionCategories.Food.value, TransactionCategories.Income.value
+    return [Transaction.objects.create(user=user, cash_account=account, title=title,
+                                       amount=amount, category=category, scheduled=True)
+            for title, amount, category in (('Rent', 30, food), ('Car', 45, food),
+                                            ('Salary', 20, income))]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 200])
+def test_uncoverable_expense_stays_scheduled_while_the_rest_applies(account, scheduled,
+                                                                    chunk_size):
+    result = ScheduledTransactionExecutor(now(), chunk_size=chunk_size).run()
+
+    assert (result['applied'], result['failed']) == (2, 1)
+    assert list(Transaction.objects.filter(scheduled=True)) == [scheduled[1]]
+    account.refresh_from_db()
+    assert (account.balance, account.total_expenses) == (40, 30)
+    assert not CashAccountUtils().get_balance_drift()
+    assert not CashAccountUtils().get_ledger_drift()
+
+
+def test_second_run_does_not_apply_rows_again(account, scheduled):
+    applied_runs = []
+    executor = ScheduledTransactionExecutor(
+        now(), on_chunk_applied=lambda applied_ids, _: applied_runs.append(applied_ids))
+    executor.run()
+    result = executor.run()
+
+    assert (result['applied'], result['failed']) == (0, 1)
+    assert applied_runs == [[scheduled[0].id, scheduled[2].id], []]
+    account.refresh_from_db()
+    assert (account.balance, account.total_expenses) == (40, 30)
+
+
+def test_first_due_transactions_are_capped_per_user_in_due_order(user):
+    due_before = now()
+    users = [user, User.objects.create(username='second', email='second@example.com'),
+             User.objects.create(username='third', email='third@example.com')]
+    expected = []
+    for index, (owner, due_count) in enumerate(zip(users, (14, 12, 3))):
+        account = CashAccount.objects.create(user=owner, title='Cash')
+        # created latest due first with every third one sharing a time, so neither the id
+        # alone nor the time alone gives the due order
+        due = [Transaction.objects.create(
+            user=owner, cash_account=account, title=f'Due {number}', amount=10,
+            category=TransactionCategories.Food.value, scheduled=True,
+            transaction_time=due_before - timedelta(hours=index + number - number % 3))
+            for number in range(due_count, 0, -1)]
+        for hours, scheduled in ((1, True), (-1, False)):
+            Transaction.objects.create(user=owner, cash_account=account, title='Not due',
+                                       amount=10, category=TransactionCategories.Food.value,
+                                       scheduled=scheduled,
+                                       transaction_time=due_before + timedelta(hours=hours))
+        due.sort(key=lambda transaction: (transaction.transaction_time, transaction.id))
+        expected.extend((owner.id, transaction.id) for transaction in due[:10])
+
+    first_due = get_first_scheduled_transactions_due(due_before)
+
+    assert [(transaction.user_id, transaction.id) for transaction in first_due] == expected
+    assert len(get_first_scheduled_transactions_due(due_before, per_user=2)) == 6
@@ -0,0 +1,55 @@
+import pytest
+from rest_framework.test import APIClient
+
+from accounts.models import EmailAuthenticatedUser as User
+from wallet.models import CashAccount, SplitTransactionMember, Transaction
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(name='friend')
+def fixture_friend():
+    friend = User.objects.create(username='friend', email='friend@example.com')
+    CashAccount.objects.create(user=friend, title='Cash', balance=100)
+    return friend
+
+
+@pytest.fixture(name='friend_client')
+def fixture_friend_client(friend):
+    client = APIClient()
+    client.force_authenticate(friend)
+    return client
+
+
+@pytest.fixture(name='split_id')
+def fixture_split_id(api_client, user, friend):
+    CashAccount.objects.create(user=user, title='Cash', balance=100)
+    return api_client.post('/splitTransactionList/', {
+        'title': 'Dinner', 'category': 5, 'total_amount': 60, 'creator': user.id,
+        'paying_friend': user.id, 'all_friends_involved': [user.id, friend.id]
+    }, format='json').json()['id']
+
+
+def get_balances(user, friend):
+    return [CashAccount.objects.get(user=owner).balance for owner in (user, friend)]
+
+
+@pytest.mark.parametrize('payment', [{'amount': -10}, {'amount': 0}, {'amount': 'ten'}, {}])
+def test_payment_must_be_a_positive_amount(user, friend, friend_client, split_id, payment):
+    balances = get_balances(user, friend)
+
+    response = friend_client.post('/paySplit/', {'split_id': split_id, **payment})
+
+    assert response.status_code == 400
+    assert get_balances(user, friend) == balances
+    assert SplitTransactionMember.objects.get(user=friend).paid_amount == 0
+    assert not Transaction.objects.filter(user=friend).exists()
+
+
+def test_payment_moves_money_to_the_paying_friend(user, friend, friend_client, split_id):
+    balances = get_balances(user, friend)
+
+    response = friend_client.post('/paySplit/', {'split_id': split_id, 'amount': 30})
+
+    assert response.status_code == 200
+    assert get_balances(user, friend) == [balances[0] + 30, balances[1] - 30]
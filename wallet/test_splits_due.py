@@ -0,0 +1,39 @@
+import pytest
+
+from accounts.models import EmailAuthenticatedUser as User
+from wallet.models import SplitTransaction, SplitTransactionMember, TransactionCategories
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(name='splits')
+def fixture_splits(user):
+    payer = User.objects.create(username='payer', email='payer@example.com')
+    splits = []
+    for payable_amount in (30, 70, 0, 50, 70, 10, 90, 20):
+        split = SplitTransaction.objects.create(
+            title=f'Split {payable_amount}', category=TransactionCategories.Food.value,
+            total_amount=100, creator=payer, paying_friend=payer)
+        SplitTransactionMember.objects.create(split=split, user=user, required_amount=100,
+                                              paid_amount=100 - payable_amount)
+        splits.append(split)
+    return splits
+
+
+def get_splits_due(api_client, **params):
+    response = api_client.get('/splitsDueMax', params)
+    assert response.status_code == 200
+    return [(due['payable_amount'], due['split']['id']) for due in response.json()]
+
+
+def test_largest_dues_come_first_newest_split_breaking_ties(api_client, splits):
+    assert get_splits_due(api_client) == [
+        (90, splits[6].id), (70, splits[4].id), (70, splits[1].id), (50, splits[3].id),
+        (30, splits[0].id)]
+
+
+def test_limit_is_not_cut_by_the_page_size(api_client, splits):
+    assert len(get_splits_due(api_client, limit=7)) == 7
+    assert len(get_splits_due(api_client, limit=100)) == len(splits)
+    assert len(get_splits_due(api_client, limit=0)) == 1
+    assert api_client.get('/splitsDueMax', {'limit': 'all'}).status_code == 400
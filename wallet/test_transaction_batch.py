@@ -0,0 +1,45 @@
+import pytest
+
+from accounts.models import EmailAuthenticatedUser as User
+from wallet.models import CashAccount, MonthlyTransactionSummary, Transaction
+
+pytestmark = pytest.mark.django_db
+
+
+def test_transaction_batch_validates_against_running_balance(user, api_client):
+    cash = CashAccount.objects.create(user=user, title='Cash', balance=100, limit=150)
+    bank = CashAccount.objects.create(user=user, title='Bank', balance=0)
+    other = CashAccount.objects.create(
+        user=User.objects.create(username='other', email='other@example.com'), title='Cash')
+
+    response = api_client.post('/transactionBatch/', {'transactions': [
+        {'title': 'Lunch', 'amount': 80, 'category': 5, 'cash_account': cash.id},
+        {'title': 'Dinner', 'amount': 30, 'category': 5, 'cash_account': cash.id},
+        {'title': 'Salary', 'amount': 500, 'category': 0, 'cash_account': cash.id},
+        {'title': 'Fuel', 'amount': 80, 'category': 2, 'cash_account': cash.id},
+        {'title': 'Salary', 'amount': 200, 'category': 0, 'cash_account': bank.id},
+        {'title': 'Other', 'amount': 10, 'category': 5, 'cash_account': other.id},
+        {'title': 'Broken', 'amount': -1, 'category': 5, 'cash_account': bank.id},
+    ]}, format='json')
+
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert [result['status'] for result in results] == ['created', 'failed', 'created',
+                                                         'failed', 'created', 'failed', 'failed']
+    assert 'amount' in results[6]['errors']
+    assert set(Transaction.objects.values_list('id', flat=True)) == {
+        results[0]['id'], results[2]['id'], results[4]['id']}
+    cash.refresh_from_db()
+    bank.refresh_from_db()
+    assert (cash.balance, cash.total_expenses) == (520, 80)
+    assert (bank.balance, bank.total_expenses) == (200, 0)
+    assert MonthlyTransactionSummary.objects.filter(cash_account=cash).count() == 2
+
+
+def test_transaction_batch_size_is_limited(api_client, settings):
+    settings.TRANSACTION_BATCH_MAX_SIZE = 1
+    item = {'title': 'Lunch', 'amount': 1, 'category': 5, 'cash_account': 1}
+
+    response = api_client.post('/transactionBatch/', {'transactions': [item, item]}, format='json')
+
+    assert response.status_code == 400
@@ -0,0 +1,86 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+
+from wallet.models import CashAccount, MonthlyTransactionSummary, Transaction
+
+pytestmark = pytest.mark.django_db
+
+CSV_FILE = b'''title,amount,category,transaction_time
+Salary,1000,Income,2021-01-01
+Lunch,20,Food,2021-01-02T13:00:00
+Fuel,30.4,2,2021-02-03
+'''
+
+OFX_FILE = b'''OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20210105120000<TRNAMT>500.00<NAME>Deposit</STMTTRN>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20210106
+<TRNAMT>-45.50
+<NAME>Groceries
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+'''
+
+
+@pytest.fixture(name='account')
+def fixture_account(user):
+    return CashAccount.objects.create(user=user, title='Cash', balance=100)
+
+
+def import_file(account, name, content):
+    client = APIClient()
+    client.force_authenticate(account.user)
+    return client.post('/importTransactions/', {'cash_account': account.id,
+                                                'file': SimpleUploadedFile(name, content)})
+
+
+@pytest.mark.parametrize('name,content,balance,expenses', [
+    ('history.csv', CSV_FILE, 100 + 1000 - 20 - 30, 50),
+    ('statement.ofx', OFX_FILE, 100 + 500 - 46, 46),
+])
+def test_import_updates_account_and_summaries(account, name, content, balance, expenses):
+    response = import_file(account, name, content)
+
+    assert response.status_code == 201, response.content
+    account.refresh_from_db()
+    assert (account.balance, account.total_expenses) == (balance, expenses)
+    imported = Transaction.objects.filter(cash_account=account)
+    assert response.json()['imported'] == imported.count()
+    assert sum(summary.transaction_count for summary in
+               MonthlyTransactionSummary.objects.filter(cash_account=account)) == imported.count()
+
+
+def test_invalid_rows_import_nothing(account):
+    content = CSV_FILE + b'Unknown,10,Rent,2021-03-01\nNegative,-5,Food,2021-03-02\n'
+
+    response = import_file(account, 'history.csv', content)
+
+    assert response.status_code == 400
+    assert [error['row'] for error in response.json()['errors']] == [4, 5]
+    assert not Transaction.objects.exists()
+    account.refresh_from_db()
+    assert account.balance == 100
+
+
+def test_amounts_too_large_for_the_account_are_rejected(account):
+    response = import_file(account, 'history.csv', b'title,amount,category,transaction_time\n'
+                                                   b'Lottery,1e12,Income,2021-01-01\n')
+    assert response.status_code == 400
+    assert response.json()['errors'] == [{'row': 1, 'error': 'Invalid amount 1e12'}]
+
+    content = b'title,amount,category,transaction_time\n' + \
+        b'Salary,2000000000,Income,2021-01-01\n' * 2
+    response = import_file(account, 'history.csv', content)
+    assert response.status_code == 400
+    assert not Transaction.objects.exists()
+
+
+def test_cash_account_must_be_a_number(account):
+    client = APIClient()
+    client.force_authenticate(account.user)
+    response = client.post('/importTransactions/', {
+        'cash_account': 'cash', 'file': SimpleUploadedFile('history.csv', CSV_FILE)})
+    assert response.status_code == 400
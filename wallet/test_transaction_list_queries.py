@@ -0,0 +1,46 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import EmailAuthenticatedUser as User
+from wallet.models import CashAccount, SplitTransaction, Transaction, TransactionCategories
+
+
+@pytest.fixture(name='split_expenses_user')
+def fixture_split_expenses_user(db):  # pylint: disable=unused-argument
+    user = User.objects.create(username='payer', email='payer@example.com')
+    friends = [User.objects.create(username=f'friend{i}', email=f'friend{i}@example.com')
+               for i in range(3)]
+    accounts = [CashAccount.objects.create(user=user, title=f'Account {i}', balance=10000)
+                for i in range(3)]
+    for i in range(30):
+        split = SplitTransaction.objects.create(title=f'Split {i}',
+                                                category=TransactionCategories.Food.value,
+                                                total_amount=90, creator=user, paying_friend=user)
+        split.all_friends_involved.set([user, *friends])
+        Transaction.objects.create(title=f'Split {i}', user=user, cash_account=accounts[i % 3],
+                                   category=TransactionCategories.Food.value, amount=90,
+                                   split_expense=split)
+    return user
+
+
+def count_list_queries(user, url, page_size):
+    client = APIClient()
+    client.force_authenticate(user)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, {'page_size': page_size})
+    assert response.status_code == 200
+    assert len(response.json()['results']) == page_size
+    return len(queries)
+
+
+# count, page, split friends prefetch, split members prefetch
+LIST_QUERIES = 4
+
+
+@pytest.mark.parametrize('url', ['/expenselist/', '/transactionsInSplit/',
+                                 '/splitTransactionList/'])
+@pytest.mark.parametrize('page_size', [5, 25])
+def test_list_query_count_is_constant(split_expenses_user, url, page_size):
+    assert count_list_queries(split_expenses_user, url, page_size) == LIST_QUERIES
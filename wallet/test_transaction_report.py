@@ -0,0 +1,85 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from django.utils.timezone import now
+
+from wallet.models import CashAccount, ReportStatus, Transaction, TransactionReport
+from wallet.tasks import delete_expired_transaction_reports, generate_transaction_report
+
+pytestmark = pytest.mark.django_db
+
+REPORT_REQUEST = {'from_date': f'{now().year}-01-01', 'to_date': f'{now().year + 1}-01-01',
+                  'report_type': 'csv'}
+
+
+@pytest.fixture(name='report_storage', autouse=True)
+def fixture_report_storage(tmp_path, monkeypatch):
+    storage = FileSystemStorage(location=tmp_path)
+    monkeypatch.setattr(TransactionReport.file.field, 'storage', storage)
+    return storage
+
+
+@pytest.fixture(name='transaction')
+def fixture_transaction(user):
+    account = CashAccount.objects.create(user=user, title='Cash', balance=100)
+    return Transaction.objects.create(title='Lunch', user=user, cash_account=account,
+                                      category=5, amount=10)
+
+
+def request_report(api_client):
+    response = api_client.post('/downloadReport/', REPORT_REQUEST)
+    generate_transaction_report(response.json()['id'])
+    return TransactionReport.objects.get(pk=response.json()['id'])
+
+
+def test_edited_transaction_gets_a_new_report(api_client, transaction):
+    report = request_report(api_client)
+    assert request_report(api_client).id == report.id
+
+    assert api_client.patch(f'/expense/{transaction.id}', {'title': 'Dinner'}
+                            ).status_code == 200
+    new_report = request_report(api_client)
+
+    assert new_report.id != report.id
+    assert 'Dinner' in new_report.file.read().decode()
+
+
+@pytest.mark.usefixtures('transaction')
+def test_failed_and_stale_reports_are_requested_again(api_client):
+    with mock.patch('wallet.tasks.ReportMaker.save_report', side_effect=RuntimeError):
+        report = request_report(api_client)
+    assert report.status == ReportStatus.Failed
+
+    pending_id = api_client.post('/downloadReport/', REPORT_REQUEST).json()['id']
+    assert api_client.post('/downloadReport/', REPORT_REQUEST).json()['id'] == pending_id
+    TransactionReport.objects.filter(pk=pending_id).update(
+        creation_time=now() - timedelta(hours=1))
+    assert api_client.post('/downloadReport/', REPORT_REQUEST).json()['id'] != pending_id
+
+
+def test_expired_reports_are_deleted_with_their_files(api_client, transaction,
+                                                      report_storage):
+    report = request_report(api_client)
+    TransactionReport.objects.filter(pk=report.pk).update(creation_time=now() - timedelta(days=8))
+    transaction.save()
+    kept_report = request_report(api_client)
+
+    assert delete_expired_transaction_reports() == 1
+    assert list(TransactionReport.objects.values_list('id', flat=True)) == [kept_report.id]
+    assert not report_storage.exists(report.file.name)
+
+
+@pytest.mark.usefixtures('transaction')
+@pytest.mark.parametrize('stream', ['true', 'false'])
+def test_downloaded_report_is_only_made_as_csv(api_client, stream):
+    response = api_client.get('/downloadReport/', {**REPORT_REQUEST, 'stream': stream})
+    assert response.status_code == 200
+    content = b''.join(response.streaming_content) if response.streaming else response.content
+    assert b'Lunch' in content
+
+    response = api_client.get('/downloadReport/', {**REPORT_REQUEST, 'report_type': 'pdf',
+                                                   'stream': stream})
+    assert response.status_code == 400
+    assert api_client.get('/downloadReport/', {'stream': stream}).status_code == 400
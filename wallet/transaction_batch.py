@@ -0,0 +1,92 @@
+""" Batched creation of expenses and incomes """
+
+from django.db import connection
+from django.db import transaction as db_transaction
+from django.utils.timezone import now
+
+from wallet.models import Transaction, TransactionCategories
+from wallet.serializers import TransactionBatchItemSerializer
+from wallet.utils import CashAccountUtils, LedgerUtils, TransactionSummaryUtils
+
+
+class TransactionBatchWriter:
+    """
+        validates a batch of expenses and incomes in order against one locked snapshot of the
+        involved cash accounts, the valid items are written in one database transaction with
+        one balance update per account
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @db_transaction.atomic
+    def apply(self, items):
+        """
+            returns one result per item in request order, created items carry the new id and
+            failed items their errors
+        """
+        item_serializers = [TransactionBatchItemSerializer(data=item) for item in items]
+        valid_items = [serializer.validated_data for serializer in item_serializers
+                       if serializer.is_valid()]
+        accounts = CashAccountUtils().lock_accounts(
+            {item['cash_account'] for item in valid_items}, user=self.user)
+        opening_totals = {account.id: (account.balance, account.total_expenses)
+                          for account in accounts.values()}
+
+        results = [self._apply_item(index, serializer, accounts)
+                   for index, serializer in enumerate(item_serializers)]
+        transactions = [result['transaction'] for result in results if 'transaction' in result]
+
+        self._save(transactions)
+        CashAccountUtils().add_to_balances(
+            {account.id: (account.balance - opening_totals[account.id][0],
+                          account.total_expenses - opening_totals[account.id][1])
+             for account in accounts.values()})
+        LedgerUtils().record_transactions(transactions)
+        TransactionSummaryUtils().add_to_monthly_summaries(transactions)
+
+        for result in results:
+            if 'transaction' in result:
+                result['id'] = result.pop('transaction').id
+        return results
+
+    def _apply_item(self, index, serializer, accounts):
+        if serializer.errors:
+            return {'index': index, 'status': 'failed', 'errors': serializer.errors}
+        item = serializer.validated_data
+        error = self._apply_to_snapshot(accounts.get(item['cash_account']), item)
+        if error:
+            return {'index': index, 'status': 'failed', 'errors': {'non_field_errors': [error]}}
+        transaction = Transaction(title=item['title'], user=self.user,
+                                  cash_account=accounts[item['cash_account']],
+                                  category=item['category'], amount=item['amount'],
+                                  transaction_time=item.get('transaction_time', now()))
+        return {'index': index, 'status': 'created', 'transaction': transaction}
+
+    @staticmethod
+    def _apply_to_snapshot(account, item):
+        """
+            applies the item to the in memory account, returns the error when it can not be
+        """
+        if account is None:
+            return 'Cash Account not found'
+        if item['category'] == TransactionCategories.Income.value:
+            account.balance += item['amount']
+            return None
+        if item['amount'] > account.balance:
+            return 'Cash Account does not have enough Balance'
+        if account.limit != 0 and account.total_expenses + item['amount'] > account.limit:
+            return 'You are exceeding your budget'
+        account.balance -= item['amount']
+        account.total_expenses += item['amount']
+        return None
+
+    @staticmethod
+    def _save(transactions):
+        # the created ids are returned to the client, backends that can not return them
+        # from a bulk insert fall back to one insert per item
+        if connection.features.can_return_rows_from_bulk_insert:
+            Transaction.objects.bulk_create(transactions)
+        else:
+            for transaction in transactions:
+                transaction.save()
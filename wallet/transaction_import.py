@@ -0,0 +1,196 @@
+""" Bulk import of transaction history from CSV and OFX files """
+
+import csv
+import re
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction as db_transaction
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import get_current_timezone, is_naive, localtime, make_aware
+
+from wallet.exceptions import TransactionImportError
+from wallet.models import CashAccount, Transaction, TransactionCategories
+from wallet.utils import CashAccountUtils, LedgerUtils, TransactionSummaryUtils
+
+OFX_TAG_REGEX = re.compile(r'<(/?)([A-Z0-9.]+)>([^<\r\n]*)')
+# largest value the integer amount and balance columns hold
+MAX_AMOUNT = 2147483647
+
+
+def parse_csv_rows(lines):
+    """
+    yields dicts with title, amount, category and transaction_time of every csv row
+    """
+    yield from csv.DictReader(lines)
+
+
+def parse_ofx_rows(lines):
+    """
+    yields every STMTTRN statement transaction, expenses are the negative amounts
+    """
+    row, in_transaction = {}, False
+    for line in lines:
+        for closing, tag, value in OFX_TAG_REGEX.findall(line):
+            if tag == 'STMTTRN':
+                if closing and in_transaction:
+                    yield row
+                row, in_transaction = {}, not closing
+            elif in_transaction and not closing:
+                row[tag] = value.strip()
+    if in_transaction:
+        yield row
+
+
+class TransactionImporter:
+    """
+        imports parsed rows into one cash account inside a single database transaction,
+        rows are validated a chunk at a time without queries and inserted with bulk_create,
+        the account and monthly summaries are updated once for the whole import
+    """
+    max_reported_errors = 100
+
+    def __init__(self, user, cash_account_id, chunk_size=5000):
+        self.user = user
+        self.cash_account_id = cash_account_id
+        self.chunk_size = chunk_size
+        self.categories = {category.label.lower(): category.value
+                           for category in TransactionCategories}
+        self.categories.update({str(category.value): category.value
+                                for category in TransactionCategories})
+        # history files repeat the same dates many times, each distinct value is parsed once
+        self.timezone = get_current_timezone()
+        self.parsed_times = {}
+
+    @db_transaction.atomic
+    def run(self, rows, file_format):
+        """
+        returns number of imported transactions, raises TransactionImportError when any row
+        is invalid or the account can not cover the imported expenses
+        """
+        account = CashAccount.objects.select_for_update().get(pk=self.cash_account_id,
+                                                              user=self.user)
+        to_transaction = self._from_ofx_row if file_format == 'ofx' else self._from_csv_row
+        rows = iter(rows)
+        errors, imported, first_row_number = [], 0, 1
+        totals = {'balance': 0, 'expenses': 0, 'monthly': {}}
+        chunk = list(islice(rows, self.chunk_size))
+        while chunk:
+            transactions = []
+            for row_number, row in enumerate(chunk, start=first_row_number):
+                try:
+                    transactions.append(to_transaction(row, account))
+                except KeyError as exception:
+                    errors.append({'row': row_number, 'error': f'Missing field {exception}'})
+                except (AttributeError, ValueError) as exception:
+                    errors.append({'row': row_number, 'error': str(exception)})
+            # once a row is invalid the rest is only validated to report every bad row
+            if not errors:
+                Transaction.objects.bulk_create(transactions, batch_size=self.chunk_size)
+                LedgerUtils().record_transactions(transactions)
+                imported += len(transactions)
+                self._add_to_totals(transactions, totals)
+            first_row_number += len(chunk)
+            chunk = list(islice(rows, self.chunk_size))
+
+        if errors:
+            raise TransactionImportError(errors[:self.max_reported_errors])
+        self._validate_account(account, totals['balance'], totals['expenses'])
+        CashAccountUtils().add_to_balances({account.id: (totals['balance'], totals['expenses'])})
+        TransactionSummaryUtils().add_monthly_totals(self.user.id, account.id, totals['monthly'])
+        return imported
+
+    @staticmethod
+    def _add_to_totals(transactions, totals):
+        for transaction in transactions:
+            if transaction.category == TransactionCategories.Income.value:
+                totals['balance'] += transaction.amount
+            else:
+                totals['balance'] -= transaction.amount
+                totals['expenses'] += transaction.amount
+            monthly_totals = totals['monthly'].setdefault(
+                (transaction.local_time.year, transaction.local_time.month, transaction.category),
+                [0, 0])
+            monthly_totals[0] += transaction.amount
+            monthly_totals[1] += 1
+
+    def _validate_account(self, account, balance_change, expenses_change):
+        errors = []
+        if account.balance + balance_change < 0:
+            errors.append({'row': None,
+                           'error': 'Cash Account does not have enough Balance'})
+        if account.limit != 0 and account.total_expenses + expenses_change > account.limit:
+            errors.append({'row': None, 'error': 'You are exceeding your budget'})
+        if account.balance + balance_change > MAX_AMOUNT or \
+                account.total_expenses + expenses_change > MAX_AMOUNT:
+            errors.append({'row': None, 'error': 'Cash Account can not hold the imported amounts'})
+        if errors:
+            raise TransactionImportError(errors)
+
+    def _from_csv_row(self, row, account):
+        category = self.categories.get(row['category'].strip().lower())
+        if category is None:
+            raise ValueError(f'Unknown category {row["category"]}')
+        return self._build_transaction(row['title'], self._parse_amount(row['amount']), category,
+                                       self._get_time(row['transaction_time'], self._parse_time),
+                                       account)
+
+    def _from_ofx_row(self, row, account):
+        amount = self._parse_amount(row['TRNAMT'], allow_negative=True)
+        category = TransactionCategories.Income.value if amount > 0 else \
+            TransactionCategories.Other.value
+        return self._build_transaction(row.get('NAME') or row.get('MEMO') or row['TRNTYPE'],
+                                       abs(amount), category,
+                                       self._get_time(row['DTPOSTED'], self._parse_ofx_time),
+                                       account)
+
+    def _build_transaction(self, title, amount, category, times, account):
+        title = title.strip()
+        if not title or len(title) > Transaction.title.field.max_length:
+            raise ValueError('Title must be between 1 and 120 characters')
+        transaction_time, local_time = times
+        transaction = Transaction(title=title, user_id=self.user.id, cash_account_id=account.id,
+                                  category=category, amount=amount,
+                                  transaction_time=transaction_time, scheduled=False)
+        # kept for the monthly summaries
+        transaction.local_time = local_time
+        return transaction
+
+    def _get_time(self, value, parse):
+        """
+        returns the aware time with its local time
+        """
+        if value not in self.parsed_times:
+            transaction_time = parse(value)
+            self.parsed_times[value] = (transaction_time,
+                                        localtime(transaction_time, self.timezone))
+        return self.parsed_times[value]
+
+    @staticmethod
+    def _parse_amount(value, allow_negative=False):
+        try:
+            amount = int(Decimal(value.strip()).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+        except InvalidOperation as exception:
+            raise ValueError(f'Invalid amount {value}') from exception
+        if amount == 0 or abs(amount) > MAX_AMOUNT or (amount < 0 and not allow_negative):
+            raise ValueError(f'Invalid amount {value}')
+        return amount
+
+    def _parse_time(self, value):
+        value = value.strip()
+        transaction_time = parse_datetime(value)
+        if transaction_time is None:
+            date = parse_date(value)
+            if date is None:
+                raise ValueError(f'Invalid transaction time {value}')
+            transaction_time = datetime(date.year, date.month, date.day)
+        return make_aware(transaction_time, self.timezone) if is_naive(transaction_time) \
+            else transaction_time
+
+    def _parse_ofx_time(self, value):
+        digits = re.match(r'\d{8,14}', value)
+        if digits is None:
+            raise ValueError(f'Invalid transaction time {value}')
+        digits = digits.group().ljust(14, '0')
+        return make_aware(datetime.strptime(digits, '%Y%m%d%H%M%S'), self.timezone)
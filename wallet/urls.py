@@ -37,6 +37,14 @@ urlpatterns = [
          name='transactions_with_split'),
     path('monthlyTransactionChartData/', views.MonthlyTransactionDataView.as_view(),
          name='monthly_transaction_chart_data'),
+    path('transactionBatch/', views.TransactionBatchView.as_view(),
+         name='transaction_batch'),
+    path('importTransactions/', views.ImportTransactionsView.as_view(),
+         name='import_transactions'),
     path('downloadReport/', views.DownloadTransactionReportView.as_view(),
-         name='download_transaction_report')
+         name='download_transaction_report'),
+    path('transactionReport/<int:pk>', views.TransactionReportView.as_view(),
+         name='transaction_report'),
+    path('transactionReport/<int:pk>/download', views.TransactionReportFileView.as_view(),
+         name='transaction_report_download'),
 ]
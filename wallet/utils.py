@@ -1,18 +1,45 @@
-from django.db.models import Sum
+from datetime import timedelta
+from functools import reduce
+from itertools import groupby
+from operator import attrgetter, or_
+from uuid import uuid4
 
-from wallet.models import Transaction, TransactionCategories
+from django.db import transaction as db_transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Prefetch, Q, Subquery, Sum, \
+    Value, When
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+from django.utils.timezone import localtime, now
+from rest_framework.exceptions import ValidationError
+
+from wallet.models import CashAccount, LedgerEntry, LedgerSnapshot, MonthlyTransactionSummary, \
+    NotificationChannel, NotificationDigestEntry, NotificationOutbox, SplitTransactionMember, \
+    Transaction, TransactionCategories, TransactionReport
 
 
 class SplitTransactionUtils:
 
     def get_user_payable_amount(self, user_id, split):
-        required_payment = split.total_amount // len(split.all_friends_involved.all())
-        paid_amount = Transaction.objects.filter(user=user_id, split_expense=split).exclude(
-            category=TransactionCategories.Income.value).aggregate(
-            Sum('amount'))['amount__sum'] or 0
-        payable = required_payment - paid_amount
-        payable = payable if payable > 0 else 0
-        return payable, required_payment, paid_amount
+        member = self._get_member(user_id, split)
+        if member is None:
+            return 0, 0, 0
+        return member.get_payable_amount(), member.required_amount, member.paid_amount
+
+    def _get_member(self, user_id, split):
+        if hasattr(split, 'prefetched_members'):
+            return next((member for member in split.prefetched_members
+                         if member.user_id == user_id), None)
+        return SplitTransactionMember.objects.filter(split=split, user=user_id).first()
+
+    def with_serializer_relations(self, queryset, prefix=''):
+        """
+            joins and prefetches everything SplitTransactionSerializer reads,
+            prefix is the lookup path to the split when serializing it nested
+        """
+        return queryset.select_related(f'{prefix}creator', f'{prefix}paying_friend'
+                                       ).prefetch_related(
+            f'{prefix}all_friends_involved',
+            Prefetch(f'{prefix}members', to_attr='prefetched_members')
+        )
 
 
 class TransactionUtils:
@@ -20,3 +47,477 @@ class TransactionUtils:
     def get_new_account_balance(self, prev_balance, amount, category):
         amount = amount if category == TransactionCategories.Income.value else -amount
         return prev_balance + amount
+
+    def with_serializer_relations(self, queryset):
+        """
+            joins and prefetches everything TransactionSerializer reads
+        """
+        queryset = queryset.select_related('user', 'cash_account', 'split_expense')
+        return SplitTransactionUtils().with_serializer_relations(queryset, prefix='split_expense__')
+
+
+class TransactionSummaryUtils:
+    """
+        keeps MonthlyTransactionSummary, CashAccount.total_expenses and the paid amounts
+        of split members in step with completed transactions, callers are expected to
+        run these inside the transaction writing the change
+    """
+
+    def add_transaction(self, transaction):
+        self._update_summary(transaction, transaction.amount, 1)
+
+    def remove_transaction(self, transaction):
+        self._update_summary(transaction, -transaction.amount, -1)
+
+    def _update_summary(self, transaction, amount, count):
+        if transaction.scheduled:
+            return
+        transaction_time = localtime(transaction.transaction_time)
+        summary, _ = MonthlyTransactionSummary.objects.select_for_update().get_or_create(
+            user_id=transaction.user_id,
+            cash_account_id=transaction.cash_account_id,
+            year=transaction_time.year,
+            month=transaction_time.month,
+            category=transaction.category
+        )
+        MonthlyTransactionSummary.objects.filter(pk=summary.pk).update(
+            total_amount=F('total_amount') + amount,
+            transaction_count=F('transaction_count') + count
+        )
+        if transaction.category != TransactionCategories.Income.value:
+            CashAccount.objects.filter(pk=transaction.cash_account_id).update(
+                total_expenses=F('total_expenses') + amount
+            )
+            if Transaction.cash_account.is_cached(transaction):
+                transaction.cash_account.total_expenses += amount
+            if transaction.split_expense_id:
+                SplitTransactionMember.objects.filter(
+                    split=transaction.split_expense_id, user=transaction.user_id
+                ).update(paid_amount=F('paid_amount') + amount)
+
+    def add_to_monthly_summaries(self, transactions):
+        """
+            adds completed transactions to the summaries with one update per summary row,
+            account totals are left to the caller
+        """
+        monthly_totals = {}
+        for transaction in transactions:
+            transaction_time = localtime(transaction.transaction_time)
+            totals = monthly_totals.setdefault(
+                (transaction.user_id, transaction.cash_account_id),
+                {}).setdefault((transaction_time.year, transaction_time.month,
+                                transaction.category), [0, 0])
+            totals[0] += transaction.amount
+            totals[1] += 1
+        for (user_id, cash_account_id), account_totals in monthly_totals.items():
+            self.add_monthly_totals(user_id, cash_account_id, account_totals)
+
+    def add_monthly_totals(self, user_id, cash_account_id, monthly_totals):
+        """
+            adds pre aggregated completed transactions to the summaries,
+            monthly_totals maps (year, month, category) to [total amount, transaction count]
+        """
+        for (year, month, category), (amount, count) in monthly_totals.items():
+            summary, _ = MonthlyTransactionSummary.objects.select_for_update().get_or_create(
+                user_id=user_id, cash_account_id=cash_account_id, year=year, month=month,
+                category=category)
+            MonthlyTransactionSummary.objects.filter(pk=summary.pk).update(
+                total_amount=F('total_amount') + amount,
+                transaction_count=F('transaction_count') + count
+            )
+
+    @db_transaction.atomic
+    def rebuild(self, batch_size=1000):
+        """
+            recomputes every summary row from the transactions table,
+            returns number of summary rows written
+        """
+        MonthlyTransactionSummary.objects.all().delete()
+        rows = Transaction.objects.filter(scheduled=False).annotate(
+            year=ExtractYear('transaction_time'), month=ExtractMonth('transaction_time')
+        ).values('user', 'cash_account', 'year', 'month', 'category').annotate(
+            total_amount=Sum('amount'), transaction_count=Count('id')).order_by()
+        summaries = MonthlyTransactionSummary.objects.bulk_create(
+            [MonthlyTransactionSummary(user_id=row['user'],
+                                       cash_account_id=row['cash_account'],
+                                       year=row['year'],
+                                       month=row['month'],
+                                       category=row['category'],
+                                       total_amount=row['total_amount'],
+                                       transaction_count=row['transaction_count'])
+             for row in rows.iterator()],
+            batch_size=batch_size)
+        return len(summaries)
+
+
+class LedgerUtils:
+    """
+        the ledger is append only, a balance is the latest snapshot of the account plus the
+        entries written after it
+    """
+
+    def record(self, legs, category=None, transaction_id=None):
+        """
+            writes one movement, legs are (cash account id, amount) pairs and whatever they
+            do not balance is booked against the outside world
+        """
+        return self.record_many([(legs, category, transaction_id)])
+
+    def record_many(self, movements, batch_size=1000):
+        """
+            writes every (legs, category, transaction id) movement as its own balanced group
+        """
+        entries = []
+        for legs, category, transaction_id in movements:
+            legs = [(account_id, amount) for account_id, amount in legs if amount]
+            outside_amount = -sum(amount for _, amount in legs)
+            if outside_amount:
+                legs.append((None, outside_amount))
+            group = uuid4()
+            entries += [LedgerEntry(group=group, cash_account_id=account_id, amount=amount,
+                                    category=category, transaction_id=transaction_id)
+                        for account_id, amount in legs]
+        return LedgerEntry.objects.bulk_create(entries, batch_size=batch_size)
+
+    def record_transactions(self, transactions):
+        """
+            writes one movement per completed transaction, for writers applying transactions
+            to the balances in bulk
+        """
+        return self.record_many(
+            [([(transaction.cash_account_id,
+                TransactionUtils().get_new_account_balance(0, transaction.amount,
+                                                           transaction.category))],
+              transaction.category, transaction.id) for transaction in transactions])
+
+    def get_balance(self, account_id, at=None):
+        """
+            balance of the account now or at a past time, from at most one snapshot and
+            the entries written after it
+        """
+        snapshots = LedgerSnapshot.objects.filter(cash_account=account_id)
+        entries = LedgerEntry.objects.filter(cash_account=account_id)
+        if at is not None:
+            snapshots = snapshots.filter(creation_time__lte=at)
+            entries = entries.filter(creation_time__lte=at)
+        snapshot = snapshots.order_by('-last_entry_id').first()
+        if snapshot is None:
+            return entries.aggregate(total=Coalesce(Sum('amount'), 0))['total']
+        return snapshot.balance + entries.filter(id__gt=snapshot.last_entry_id).aggregate(
+            total=Coalesce(Sum('amount'), 0))['total']
+
+    @db_transaction.atomic
+    def take_snapshots(self, lag, batch_size=1000):
+        """
+            snapshots every account with entries since the last run, entries younger than
+            lag seconds are left for the next run so a movement still committing when its
+            newer neighbours are snapshotted is not skipped. returns number of snapshots
+        """
+        last_entry_id = LedgerEntry.objects.filter(
+            creation_time__lte=now() - timedelta(seconds=lag)).aggregate(
+            last=Max('id'))['last']
+        previous_entry_id = LedgerSnapshot.objects.aggregate(
+            last=Coalesce(Max('last_entry_id'), 0))['last']
+        if last_entry_id is None or last_entry_id <= previous_entry_id:
+            return 0
+        changes = dict(LedgerEntry.objects.filter(
+            cash_account__isnull=False, id__gt=previous_entry_id, id__lte=last_entry_id
+        ).values('cash_account').annotate(total=Sum('amount')).order_by().values_list(
+            'cash_account', 'total'))
+        # every account with entries before previous_entry_id was snapshotted at it
+        latest_balances = dict(LedgerSnapshot.objects.filter(
+            cash_account__in=changes.keys(),
+            last_entry_id=Subquery(LedgerSnapshot.objects.filter(
+                cash_account=OuterRef('cash_account')).order_by('-last_entry_id').values(
+                'last_entry_id')[:1])
+        ).values_list('cash_account', 'balance'))
+        snapshots = LedgerSnapshot.objects.bulk_create(
+            [LedgerSnapshot(cash_account_id=account_id, last_entry_id=last_entry_id,
+                            balance=latest_balances.get(account_id, 0) + change)
+             for account_id, change in changes.items()], batch_size=batch_size)
+        return len(snapshots)
+
+
+class CashAccountUtils:
+    """
+        every change of CashAccount.balance goes through apply_transaction, move_balance or
+        add_to_balances inside the database transaction writing the matching transactions
+    """
+
+    def lock_accounts(self, account_ids, **filters):
+        """
+            locks the accounts in primary key order, so writers touching several accounts
+            can not deadlock each other, returns them by id
+        """
+        return {account.id: account for account in CashAccount.objects.select_for_update(
+        ).filter(pk__in=account_ids, **filters).order_by('pk')}
+
+    @db_transaction.atomic
+    def apply_transaction(self, account_id, category, amount, transaction_id=None):
+        """
+            moves the balance of the account by a transaction of amount, a negative amount
+            takes a transaction back. total_expenses itself is kept by TransactionSummaryUtils.
+            returns the account with its new balance
+        """
+        balance_change = self.move_balance(account_id, category, amount)
+        LedgerUtils().record([(account_id, balance_change)], category=category,
+                             transaction_id=transaction_id)
+        return CashAccount.objects.get(pk=account_id)
+
+    @db_transaction.atomic
+    def transfer(self, from_account_id, to_account_id, category, amount, transaction_id=None):
+        """
+            pays amount from one account into another as a single ledger movement,
+            transaction_id is the payment transaction of the paying account
+        """
+        if category == TransactionCategories.Income.value:
+            raise ValidationError('Income can not be an expense')
+        self.lock_accounts([from_account_id, to_account_id])
+        self.move_balance(from_account_id, category, amount)
+        self.move_balance(to_account_id, TransactionCategories.Income.value, amount)
+        LedgerUtils().record([(from_account_id, -amount), (to_account_id, amount)],
+                             category=category, transaction_id=transaction_id)
+
+    @db_transaction.atomic
+    def set_balance(self, account_id, balance):
+        """
+            moves the balance to one set by hand as an adjustment that is not backed by a
+            transaction, the opening balance moves along so reconciliation keeps its baseline.
+            returns the adjustment
+        """
+        adjustment = balance - self.lock_accounts([account_id])[account_id].balance
+        CashAccount.objects.filter(pk=account_id).update(
+            balance=F('balance') + adjustment,
+            opening_balance=F('opening_balance') + adjustment)
+        self.record_adjustment(account_id, adjustment)
+        return adjustment
+
+    def record_adjustment(self, account_id, amount):
+        """
+            records a balance set directly on the account, opening balances and hand edits
+        """
+        LedgerUtils().record([(account_id, amount)])
+
+    def move_balance(self, account_id, category, amount):
+        """
+            moves the balance without writing the ledger, for writers that record the saved
+            transaction afterwards with LedgerUtils.record_transactions. returns the change
+        """
+        balance_change = TransactionUtils().get_new_account_balance(0, amount, category)
+        accounts = CashAccount.objects.filter(pk=account_id)
+        if category != TransactionCategories.Income.value and amount > 0:
+            # a growing expense is checked by the update itself, so the check and the write
+            # can not be interleaved with a concurrent writer of the same account
+            accounts = accounts.filter(Q(limit=0) | Q(total_expenses__lte=F('limit') - amount),
+                                       balance__gte=amount)
+        if not accounts.update(balance=F('balance') + balance_change):
+            self._raise_rejected(account_id, amount)
+        return balance_change
+
+    def _raise_rejected(self, account_id, amount):
+        if amount > CashAccount.objects.get(pk=account_id).balance:
+            raise ValidationError('Cash Account does not have enough Balance')
+        raise ValidationError('You are exceeding your budget')
+
+    def add_to_balances(self, changes):
+        """
+            changes maps account id to (balance change, total expenses change) already
+            validated against accounts locked by the caller, one F() update per account.
+            the caller records the transactions behind the changes with
+            LedgerUtils.record_transactions
+        """
+        for account_id, (balance_change, expenses_change) in changes.items():
+            if balance_change or expenses_change:
+                CashAccount.objects.filter(pk=account_id).update(
+                    balance=F('balance') + balance_change,
+                    total_expenses=F('total_expenses') + expenses_change)
+
+    def get_expense_drift(self):
+        """
+            returns (account, expected total expenses) for every account whose stored
+            total_expenses does not match its completed expense transactions
+        """
+        expected_expenses = dict(
+            Transaction.objects.filter(scheduled=False).exclude(
+                category=TransactionCategories.Income.value).values('cash_account').annotate(
+                total=Sum('amount')).order_by().values_list('cash_account', 'total'))
+        drifted_accounts = []
+        for account in CashAccount.objects.only('id', 'title', 'user', 'total_expenses'
+                                                ).iterator():
+            expected = expected_expenses.get(account.id, 0)
+            if account.total_expenses != expected:
+                drifted_accounts.append((account, expected))
+        return drifted_accounts
+
+    @db_transaction.atomic
+    def repair_expense_drift(self, drifted_accounts, batch_size=1000):
+        """
+            moves every total by its drift instead of overwriting it, so expenses written
+            since the drift was computed are kept
+        """
+        for start in range(0, len(drifted_accounts), batch_size):
+            batch = drifted_accounts[start:start + batch_size]
+            CashAccount.objects.filter(pk__in=[account.id for account, _ in batch]).update(
+                total_expenses=F('total_expenses') + Case(*[
+                    When(pk=account.id, then=Value(expected - account.total_expenses))
+                    for account, expected in batch]))
+
+    def get_balance_drift(self):
+        """
+            returns (account, expected balance) for every account whose stored balance does
+            not match its opening balance plus its completed transactions, computed in one
+            grouped aggregate so balances and transactions are read in the same snapshot
+        """
+        income = TransactionCategories.Income.value
+        drifted_accounts = CashAccount.objects.annotate(
+            expected_balance=F('opening_balance') + Coalesce(Sum(
+                Case(When(transaction__category=income, then=F('transaction__amount')),
+                     default=-F('transaction__amount')),
+                filter=Q(transaction__scheduled=False)), 0)
+        ).exclude(balance=F('expected_balance')).only('id', 'title', 'user', 'balance')
+        return [(account, account.expected_balance) for account in drifted_accounts.iterator()]
+
+    @db_transaction.atomic
+    def repair_balance_drift(self, drifted_accounts, batch_size=1000):
+        """
+            moves every balance by its drift instead of overwriting it, so transactions
+            written since the drift was computed are kept
+        """
+        for start in range(0, len(drifted_accounts), batch_size):
+            batch = drifted_accounts[start:start + batch_size]
+            CashAccount.objects.filter(pk__in=[account.id for account, _ in batch]).update(
+                balance=F('balance') + Case(*[When(pk=account.id,
+                                                   then=Value(expected - account.balance))
+                                              for account, expected in batch]))
+            LedgerUtils().record_many([([(account.id, expected - account.balance)], None, None)
+                                       for account, expected in batch])
+
+    def get_ledger_drift(self):
+        """
+            returns (account, ledger balance) for every account whose stored balance does not
+            match its ledger, summed from the latest snapshot of the account and the entries
+            written after it in one query
+        """
+        latest_snapshots = LedgerSnapshot.objects.filter(
+            cash_account=OuterRef('pk')).order_by('-last_entry_id')
+        drifted_accounts = CashAccount.objects.annotate(
+            snapshot_balance=Coalesce(Subquery(latest_snapshots.values('balance')[:1]), 0),
+            snapshot_entry_id=Coalesce(Subquery(latest_snapshots.values('last_entry_id')[:1]), 0)
+        ).annotate(
+            ledger_balance=F('snapshot_balance') + Coalesce(Subquery(
+                LedgerEntry.objects.filter(cash_account=OuterRef('pk'),
+                                           id__gt=OuterRef('snapshot_entry_id')).order_by(
+                ).values('cash_account').annotate(total=Sum('amount')).values('total')), 0)
+        ).exclude(balance=F('ledger_balance')).only('id', 'title', 'user', 'balance')
+        return [(account, account.ledger_balance) for account in drifted_accounts.iterator()]
+
+    @db_transaction.atomic
+    def repair_ledger_drift(self, drifted_accounts, batch_size=1000):
+        """
+            books the difference of every drifted account as an adjustment, so the ledger
+            agrees with the stored balance again. reconcile balances with their transactions
+            first, that repair moves the ledger along
+        """
+        for start in range(0, len(drifted_accounts), batch_size):
+            LedgerUtils().record_many([([(account.id, account.balance - ledger_balance)], None,
+                                        None) for account, ledger_balance in
+                                       drifted_accounts[start:start + batch_size]])
+
+
+class TransactionReportUtils:
+
+    def delete_expired(self, before, batch_size=500):
+        """
+            deletes reports requested before given time together with their files,
+            returns number of deleted reports
+        """
+        deleted = 0
+        while True:
+            reports = list(TransactionReport.objects.filter(creation_time__lt=before
+                                                            ).order_by('pk')[:batch_size])
+            if not reports:
+                return deleted
+            for report in reports:
+                if report.file:
+                    report.file.delete(save=False)
+            TransactionReport.objects.filter(pk__in=[report.pk for report in reports]).delete()
+            deleted += len(reports)
+
+
+class NotificationOutboxUtils:
+
+    def add(self, notification_type, data, dedupe_key):
+        """
+            queues a notification, call inside the database transaction of the change it
+            announces so it is only sent once that change commits
+        """
+        NotificationOutbox.objects.create(notification_type=notification_type, payload=data,
+                                          dedupe_key=dedupe_key)
+
+    def add_many(self, notifications):
+        """
+            notifications are (notification type, data, dedupe key) triples
+        """
+        NotificationOutbox.objects.bulk_create([
+            NotificationOutbox(notification_type=notification_type, payload=data,
+                               dedupe_key=dedupe_key)
+            for notification_type, data, dedupe_key in notifications
+        ])
+
+    @db_transaction.atomic
+    def drain_batch(self, dispatch, batch_size):
+        """
+            claims the oldest pending notifications, hands them to dispatch as
+            (notification type, data) pairs with duplicates removed and deletes them,
+            a failing dispatch rolls the claim back so nothing is lost
+            returns number of claimed rows
+        """
+        entries = list(NotificationOutbox.objects.select_for_update(skip_locked=True
+                                                                    ).order_by('pk')[:batch_size])
+        if not entries:
+            return 0
+        notifications = {}
+        for entry in entries:
+            notifications.setdefault(entry.dedupe_key, (entry.notification_type, entry.payload))
+        NotificationOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+        dispatch(list(notifications.values()))
+        return len(entries)
+
+
+class NotificationDigestUtils:
+
+    def add_many(self, entries):
+        """
+            entries are (channel, recipient, notification type, payload) tuples
+        """
+        NotificationDigestEntry.objects.bulk_create([
+            NotificationDigestEntry(channel=channel, recipient=recipient,
+                                    notification_type=notification_type, payload=payload)
+            for channel, recipient, notification_type, payload in entries if recipient
+        ])
+
+    @db_transaction.atomic
+    def flush_due_batch(self, dispatch, window, batch_size):
+        """
+            claims every entry of up to batch_size recipients whose oldest entry is older than
+            window seconds, hands them to dispatch as {channel: [(recipient, entries)]} and
+            deletes them, a failing dispatch rolls the claim back
+            returns number of claimed entries
+        """
+        due_recipients = list(NotificationDigestEntry.objects.filter(
+            creation_time__lte=now() - timedelta(seconds=window)
+        ).values_list('channel', 'recipient').distinct().order_by()[:batch_size])
+        if not due_recipients:
+            return 0
+        entries = list(NotificationDigestEntry.objects.select_for_update(skip_locked=True).filter(
+            reduce(or_, (Q(channel=channel, recipient=recipient)
+                         for channel, recipient in due_recipients))
+        ).order_by('channel', 'recipient', 'creation_time', 'pk'))
+
+        digests = {channel: [] for channel in NotificationChannel.values}
+        for (channel, recipient), recipient_entries in groupby(
+                entries, key=attrgetter('channel', 'recipient')):
+            digests[channel].append((recipient, list(recipient_entries)))
+        NotificationDigestEntry.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+        dispatch(digests)
+        return len(entries)
@@ -1,30 +1,43 @@
-from datetime import datetime
-
-from django.db.models import Q, Sum
-from django.http import HttpResponse
-from rest_framework import generics, filters, serializers
-from rest_framework.exceptions import ValidationError
+import io
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F, Q, Sum, Value
+from django.db.models.functions import Greatest
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.timezone import now
+from rest_framework import generics, filters, serializers, status
+from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from accounts.models import EmailAuthenticatedUser as User
-from accounts.serializers import UserSerializer
+from budget_tracker.pagination import TransactionPagination
+from wallet.exceptions import TransactionImportError
 from wallet.filters import IncomeFilterBackend
 from wallet.filters import TransactionFilterBackend, ScheduledTransactionFilterBackend, \
     ExpenseFilterBackend
-from wallet.models import Transaction, CashAccount, SplitTransaction, TransactionCategories
+from wallet.models import Transaction, CashAccount, SplitTransaction, TransactionCategories, \
+    MonthlyTransactionSummary, SplitTransactionMember, TransactionReport, ReportStatus
 from wallet.report_maker import ReportMaker
-from wallet.serializers import SplitTransactionSerializer, MaxSplitsDueSerializer
+from wallet.serializers import SplitTransactionSerializer, MaxSplitsDueSerializer, \
+    TransactionReportSerializer
 from wallet.serializers import TransactionSerializer, CashAccountSerializer, \
     ScheduledTransactionSerializer
 from wallet.services import Notification
-from wallet.tasks import send_all_notification
-from wallet.utils import SplitTransactionUtils, TransactionUtils
+from wallet.tasks import generate_transaction_report
+from wallet.transaction_batch import TransactionBatchWriter
+from wallet.transaction_import import TransactionImporter, parse_csv_rows, parse_ofx_rows
+from wallet.utils import CashAccountUtils, LedgerUtils, NotificationOutboxUtils, \
+    SplitTransactionUtils, TransactionUtils, TransactionSummaryUtils
 
 
 class ExpenseListView(generics.ListCreateAPIView):
-    queryset = Transaction.objects.all()
+    queryset = TransactionUtils().with_serializer_relations(Transaction.objects.all())
     serializer_class = TransactionSerializer
+    pagination_class = TransactionPagination
     filter_backends = [TransactionFilterBackend,
                        ExpenseFilterBackend,
                        filters.OrderingFilter,
@@ -32,44 +45,47 @@ class ExpenseListView(generics.ListCreateAPIView):
     search_fields = ['title']
     ordering = ['-transaction_time']
 
+    @db_transaction.atomic
     def perform_create(self, serializer):
         if serializer.validated_data.get('category') == TransactionCategories.Income.value:
             raise serializers.ValidationError('Income can not be an expense')
-        account = CashAccount.objects.get(pk=serializer.initial_data.get('cash_account'))
-        account.balance = TransactionUtils().get_new_account_balance(
-            account.balance,
-            serializer.validated_data.get('amount'),
-            serializer.validated_data.get('category')
-        )
-        account.save()
-        serializer.save()
+        # the balance update is the first write, so concurrent writers queue on the account
+        CashAccountUtils().move_balance(serializer.initial_data.get('cash_account'),
+                                        serializer.validated_data.get('category'),
+                                        serializer.validated_data.get('amount'))
+        expense = serializer.save()
+        LedgerUtils().record_transactions([expense])
+        TransactionSummaryUtils().add_transaction(expense)
 
 
 class ExpenseView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Transaction.objects.all()
+    queryset = TransactionUtils().with_serializer_relations(Transaction.objects.all())
     serializer_class = TransactionSerializer
     filter_backends = [TransactionFilterBackend, ExpenseFilterBackend, filters.OrderingFilter]
 
+    @db_transaction.atomic
     def perform_update(self, serializer):
-        account = serializer.instance.cash_account
-        account.balance = TransactionUtils().get_new_account_balance(
-            account.balance + serializer.instance.amount,
-            serializer.validated_data.get('amount'),
-            serializer.instance.category
-        )
-        account.save()
-        serializer.save()
-        serializer.save()
-
+        serializer.instance.cash_account = CashAccountUtils().apply_transaction(
+            serializer.instance.cash_account_id, serializer.instance.category,
+            serializer.validated_data.get('amount', serializer.instance.amount) -
+            serializer.instance.amount, transaction_id=serializer.instance.id)
+        TransactionSummaryUtils().remove_transaction(serializer.instance)
+        expense = serializer.save()
+        TransactionSummaryUtils().add_transaction(expense)
+
+    @db_transaction.atomic
     def perform_destroy(self, instance):
-        instance.cash_account.balance = instance.cash_account.balance + instance.amount
-        instance.cash_account.save()
+        instance.cash_account = CashAccountUtils().apply_transaction(
+            instance.cash_account_id, instance.category, -instance.amount,
+            transaction_id=instance.id)
+        TransactionSummaryUtils().remove_transaction(instance)
         instance.delete()
 
 
 class IncomeListView(generics.ListCreateAPIView):
-    queryset = Transaction.objects.all()
+    queryset = TransactionUtils().with_serializer_relations(Transaction.objects.all())
     serializer_class = TransactionSerializer
+    pagination_class = TransactionPagination
     filter_backends = [TransactionFilterBackend,
                        IncomeFilterBackend,
                        filters.OrderingFilter,
@@ -77,37 +93,40 @@ class IncomeListView(generics.ListCreateAPIView):
     search_fields = ['title']
     ordering = ['-transaction_time']
 
+    @db_transaction.atomic
     def perform_create(self, serializer):
         if serializer.validated_data.get('category') != TransactionCategories.Income.value:
             raise ValidationError('Income can not be an expense')
-        account = CashAccount.objects.get(pk=serializer.initial_data.get('cash_account'))
-        account.balance = TransactionUtils().get_new_account_balance(
-            account.balance,
-            serializer.validated_data.get('amount'),
-            serializer.validated_data.get('category')
-        )
-        account.save()
-        serializer.save()
+        # the balance update is the first write, so concurrent writers queue on the account
+        CashAccountUtils().move_balance(serializer.initial_data.get('cash_account'),
+                                        serializer.validated_data.get('category'),
+                                        serializer.validated_data.get('amount'))
+        income = serializer.save()
+        LedgerUtils().record_transactions([income])
+        TransactionSummaryUtils().add_transaction(income)
 
 
 class IncomeView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Transaction.objects.all()
+    queryset = TransactionUtils().with_serializer_relations(Transaction.objects.all())
     serializer_class = TransactionSerializer
     filter_backends = [TransactionFilterBackend, IncomeFilterBackend, filters.OrderingFilter]
 
+    @db_transaction.atomic
     def perform_update(self, serializer):
-        account = serializer.instance.cash_account
-        account.balance = TransactionUtils().get_new_account_balance(
-            account.balance - serializer.instance.amount,
-            serializer.validated_data.get('amount'),
-            serializer.instance.category
-        )
-        account.save()
-        serializer.save()
-
+        serializer.instance.cash_account = CashAccountUtils().apply_transaction(
+            serializer.instance.cash_account_id, serializer.instance.category,
+            serializer.validated_data.get('amount', serializer.instance.amount) -
+            serializer.instance.amount, transaction_id=serializer.instance.id)
+        TransactionSummaryUtils().remove_transaction(serializer.instance)
+        income = serializer.save()
+        TransactionSummaryUtils().add_transaction(income)
+
+    @db_transaction.atomic
     def perform_destroy(self, instance):
-        instance.cash_account.balance = instance.cash_account.balance - instance.amount
-        instance.cash_account.save()
+        instance.cash_account = CashAccountUtils().apply_transaction(
+            instance.cash_account_id, instance.category, -instance.amount,
+            transaction_id=instance.id)
+        TransactionSummaryUtils().remove_transaction(instance)
         instance.delete()
 
 
@@ -138,61 +157,83 @@ class TransactionCategoryChoicesList(APIView):
         return Response(choices)
 
 
-class ExpenseCategoryDataView(APIView):
+class ChartPeriodMixin:
+    """
+        reads the year and month a chart is drawn for, both default to the current one
+    """
+
+    def get_period_param(self, name, default, max_value):
+        try:
+            value = int(self.request.GET.get(name) or default)
+        except ValueError as exception:
+            raise ValidationError(f'{name} must be a number') from exception
+        if not 1 <= value <= max_value:
+            raise ValidationError(f'{name} must be between 1 and {max_value}')
+        return value
+
+    def get_year(self):
+        return self.get_period_param('year', datetime.now().year, 9999)
+
+    def get_month(self):
+        return self.get_period_param('month', datetime.now().month, 12)
+
+
+class ExpenseCategoryDataView(ChartPeriodMixin, APIView):
+
+    def get_queryset(self):
+        return MonthlyTransactionSummary.objects.filter(
+            user=self.request.user.id,
+            year=self.get_year(),
+            month=self.get_month()
+        ).exclude(category=TransactionCategories.Income.value
+                  ).values('cash_account', 'category'
+                           ).annotate(total=Sum('total_amount')
+                                      ).order_by('cash_account', 'category')
 
     def get(self, request):
-        def get_total_expenses(category, account):
-            total_category_expenses = Transaction.objects.filter(user=request.user.id,
-                                                                 category=category,
-                                                                 cash_account=account,
-                                                                 transaction_time__month=
-                                                                 request.GET.get('month'),
-                                                                 scheduled=False
-                                                                 ).aggregate(Sum('amount')
-                                                                             )['amount__sum']
-            return total_category_expenses or 0
-
-        accounts = CashAccount.objects.filter(user=request.user.id)
-        data = {}
-        for account in accounts:
-            data[account.title] = [(category[1], get_total_expenses(category[0], account))
-                                   for category in TransactionCategories.choices if
-                                   get_total_expenses(category[0], account) > 0
-                                   and category[1] != 'Income']
+        category_labels = dict(TransactionCategories.choices)
+
+        accounts = CashAccount.objects.filter(user=request.user.id).values_list('id', 'title')
+        account_totals = {}
+        for row in self.get_queryset():
+            if row['total'] > 0:
+                account_totals.setdefault(row['cash_account'], []).append(
+                    (category_labels[row['category']], row['total']))
+
+        data = {title: account_totals.get(account_id, []) for account_id, title in accounts}
         return Response(data)
 
 
-class MonthlyTransactionDataView(APIView):
+class MonthlyTransactionDataView(ChartPeriodMixin, APIView):
 
-    def get_month_data(self, user_id, month):
-        transactions = Transaction.objects.filter(user=user_id,
-                                                  transaction_time__month=month,
-                                                  transaction_time__year=datetime.now().year,
-                                                  scheduled=False
-                                                  )
-        total_expenses = transactions.exclude(category=TransactionCategories.Income.value
-                                              ).aggregate(Sum('amount'))['amount__sum']
-        total_income = \
-            transactions.filter(category=TransactionCategories.Income.value).aggregate(
-                Sum('amount'))[
-                'amount__sum']
-        return total_income, total_expenses
+    def get_queryset(self):
+        income = TransactionCategories.Income.value
+        return MonthlyTransactionSummary.objects.filter(
+            user=self.request.user.id,
+            year=self.get_year()
+        ).values('month').annotate(
+            total_income=Sum('total_amount', filter=Q(category=income)),
+            total_expenses=Sum('total_amount', filter=~Q(category=income))
+        ).order_by('month')
+
+    def get(self, request):  # pylint: disable=unused-argument
+        monthly_totals = {row['month']: row for row in self.get_queryset()}
 
-    def get(self, request):
         data = {
             'income': [],
             'expense': []
         }
         for month in range(1, 13):
-            month_data = self.get_month_data(request.user.id, month)
-            data['income'].append(month_data[0])
-            data['expense'].append(month_data[1])
+            month_data = monthly_totals.get(month, {})
+            data['income'].append(month_data.get('total_income'))
+            data['expense'].append(month_data.get('total_expenses'))
 
         return Response(data)
 
 
 class ScheduledTransactionListView(generics.ListCreateAPIView):
-    queryset = Transaction.objects.all().order_by('transaction_time')
+    queryset = Transaction.objects.select_related('user', 'cash_account'
+                                                  ).order_by('transaction_time')
     serializer_class = ScheduledTransactionSerializer
     filter_backends = [ScheduledTransactionFilterBackend,
                        filters.OrderingFilter,
@@ -201,7 +242,7 @@ class ScheduledTransactionListView(generics.ListCreateAPIView):
 
 
 class ScheduledTransactionView(generics.RetrieveDestroyAPIView):
-    queryset = Transaction.objects.all()
+    queryset = Transaction.objects.select_related('user', 'cash_account')
     serializer_class = ScheduledTransactionSerializer
     filter_backends = [ScheduledTransactionFilterBackend,
                        filters.OrderingFilter]
@@ -213,11 +254,13 @@ class SplitTransactionListView(generics.ListCreateAPIView):
     search_fields = ['title', 'creator__username', 'paying_friend__username']
 
     def get_queryset(self):
-        return SplitTransaction.objects.filter(
+        splits = SplitTransaction.objects.filter(
             Q(creator=self.request.user.id) | Q(paying_friend=self.request.user.id) |
             Q(all_friends_involved__id=self.request.user.id)
         ).distinct().order_by('creator__username')
+        return SplitTransactionUtils().with_serializer_relations(splits)
 
+    @db_transaction.atomic
     def perform_create(self, serializer):
         split = serializer.save()
         payment_transaction_title = f"{split.title} paid by {split.creator.username}"
@@ -232,10 +275,9 @@ class SplitTransactionListView(generics.ListCreateAPIView):
                   })
         if payment_transaction_serializer.is_valid():
             ExpenseListView().perform_create(payment_transaction_serializer)
-            send_all_notification.delay(notification_type=Notification.SPLIT_INCLUDE_NOTIFICATION,
-                                        data={
-                                            'split': SplitTransactionSerializer(split).data
-                                        })
+            NotificationOutboxUtils().add(Notification.SPLIT_INCLUDE_NOTIFICATION,
+                                          {'split_id': split.id},
+                                          dedupe_key=f'split_include:{split.id}')
 
         else:
             SplitTransaction.objects.get(pk=split.id).delete()
@@ -243,17 +285,46 @@ class SplitTransactionListView(generics.ListCreateAPIView):
 
 
 class SplitTransactionView(generics.RetrieveDestroyAPIView):
-    queryset = SplitTransaction.objects.all()
+    queryset = SplitTransactionUtils().with_serializer_relations(SplitTransaction.objects.all())
     serializer_class = SplitTransactionSerializer
 
+    @db_transaction.atomic
+    def perform_destroy(self, instance):
+        split_transactions = list(Transaction.objects.filter(split_expense=instance,
+                                                             scheduled=False))
+        CashAccountUtils().lock_accounts({split_transaction.cash_account_id
+                                          for split_transaction in split_transactions})
+        for split_transaction in split_transactions:
+            CashAccountUtils().apply_transaction(split_transaction.cash_account_id,
+                                                 split_transaction.category,
+                                                 -split_transaction.amount,
+                                                 transaction_id=split_transaction.id)
+            TransactionSummaryUtils().remove_transaction(split_transaction)
+        instance.delete()
+
 
 class PaySplit(APIView):
 
+    def get_amount(self):
+        try:
+            amount = int(self.request.data.get('amount'))
+        except (TypeError, ValueError) as exception:
+            raise ValidationError('amount must be a number') from exception
+        if amount <= 0:
+            raise ValidationError('amount must be greater than zero')
+        return amount
+
+    @db_transaction.atomic
     def post(self, request):
-        split = SplitTransaction.objects.get(pk=request.data.get('split_id'))
-        payable, split_payment, paid_amount = SplitTransactionUtils().get_user_payable_amount(
-            request.user.id, split)
-        if int(request.data.get('amount')) > (split_payment - paid_amount):
+        amount = self.get_amount()
+        split = SplitTransaction.objects.select_related('creator', 'paying_friend'
+                                                        ).get(pk=request.data.get('split_id'))
+        member = SplitTransactionMember.objects.select_for_update().filter(
+            split=split, user=request.user.id).first()
+        if member is None:
+            raise ValidationError('You are not involved in this split')
+        split_payment, paid_amount = member.required_amount, member.paid_amount
+        if amount > (split_payment - paid_amount):
             raise ValidationError('Entering More Than Required Amount')
 
         payment_transaction_title = f"{split.title} paid by {split.creator.username}"
@@ -263,11 +334,10 @@ class PaySplit(APIView):
                   'user': request.user.id,
                   'cash_account': payer_cash_account.id,
                   'category': split.category,
-                  'amount': request.data.get(
-                      'amount'),
+                  'amount': amount,
                   'split_expense': split.id
                   })
-        user = User.objects.get(pk=request.user.id)
+        user = request.user
         receiving_transaction_title = f"Payment for {split.title} paid by {user.username}"
         receiver_cash_account = CashAccount.objects.get(user=split.paying_friend.id, title='Cash')
         receiving_transaction_serializer = TransactionSerializer(
@@ -275,22 +345,28 @@ class PaySplit(APIView):
                   'user': split.paying_friend.id,
                   'cash_account': receiver_cash_account.id,
                   'category': TransactionCategories.choices[0][0],
-                  'amount': request.data.get('amount'),
+                  'amount': amount,
                   'split_expense': split.id
                   })
 
         if (payment_transaction_serializer.is_valid() and
                 receiving_transaction_serializer.is_valid()):
-            ExpenseListView().perform_create(payment_transaction_serializer)
-            IncomeListView().perform_create(receiving_transaction_serializer)
-            send_all_notification.delay(notification_type=Notification.SPLIT_PAYMENT_NOTIFICATION,
-                                        data={
-                                            'split': SplitTransactionSerializer(split).data,
-                                            'user': UserSerializer(user).data,
-                                            'payment': int(request.data.get('amount')),
-                                            'split_payment': split_payment,
-                                            'paid_amount': paid_amount
-                                        })
+            for transaction_serializer in (payment_transaction_serializer,
+                                           receiving_transaction_serializer):
+                TransactionSummaryUtils().add_transaction(transaction_serializer.save())
+            CashAccountUtils().transfer(payer_cash_account.id, receiver_cash_account.id,
+                                        split.category, amount,
+                                        transaction_id=payment_transaction_serializer.instance.id)
+            NotificationOutboxUtils().add(
+                Notification.SPLIT_PAYMENT_NOTIFICATION,
+                {
+                    'split_id': split.id,
+                    'user_id': user.id,
+                    'payment': amount,
+                    'split_payment': split_payment,
+                    'paid_amount': paid_amount
+                },
+                dedupe_key=f'split_payment:{payment_transaction_serializer.instance.id}')
             return Response('Payment Successful')
 
         else:
@@ -299,9 +375,13 @@ class PaySplit(APIView):
 
 class TransactionsWithSplit(generics.ListAPIView):
     serializer_class = TransactionSerializer
+    pagination_class = TransactionPagination
 
     def get_queryset(self):
-        return Transaction.objects.filter(user=self.request.user.id, split_expense__isnull=False)
+        transactions = Transaction.objects.filter(user=self.request.user.id,
+                                                  split_expense__isnull=False
+                                                  ).order_by('-transaction_time')
+        return TransactionUtils().with_serializer_relations(transactions)
 
 
 class SplitPaymentData(APIView):
@@ -315,32 +395,136 @@ class SplitPaymentData(APIView):
 
 class MaximumSplitsDue(generics.ListAPIView):
     serializer_class = MaxSplitsDueSerializer
+    pagination_class = None
+    default_limit = 5
+    max_limit = 50
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.GET.get('limit', self.default_limit))
+        except ValueError as exception:
+            raise ValidationError('limit must be a number') from exception
+        return min(max(limit, 1), self.max_limit)
 
     def get_queryset(self):
-        splits = SplitTransaction.objects.filter(
-            Q(creator=self.request.user.id) | Q(paying_friend=self.request.user.id) |
-            Q(all_friends_involved__id=self.request.user.id)
-        ).distinct().order_by('creator__username')
+        members = SplitTransactionMember.objects.filter(user=self.request.user.id).annotate(
+            payable_amount=Greatest(F('required_amount') - F('paid_amount'), Value(0))
+        ).order_by('-payable_amount', '-split')[:self.get_limit()]
+        members = SplitTransactionUtils().with_serializer_relations(members, prefix='split__')
+
+        return [{'split': member.split, 'payable_amount': member.payable_amount}
+                for member in members]
 
-        payable_splits = [{'split': split,
-                           'payable_amount': SplitTransactionUtils().get_user_payable_amount(
-                               user_id=self.request.user.id,
-                               split=split)[0]}
-                          for split in splits]
-        payable_splits.sort(reverse=True, key=lambda split: split['payable_amount'])
 
-        return payable_splits[:5]
+class TransactionBatchView(APIView):
+
+    def post(self, request):
+        items = request.data.get('transactions')
+        if not isinstance(items, list) or not items:
+            raise ValidationError('transactions must be a non empty list')
+        if len(items) > settings.TRANSACTION_BATCH_MAX_SIZE:
+            raise ValidationError(f'At most {settings.TRANSACTION_BATCH_MAX_SIZE} transactions '
+                                  f'can be sent in one batch')
+        return Response({'results': TransactionBatchWriter(request.user).apply(items)})
+
+
+class ImportTransactionsView(APIView):
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        try:
+            cash_account_id = int(request.data.get('cash_account'))
+        except (TypeError, ValueError) as exception:
+            raise ValidationError('cash_account must be a number') from exception
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is None:
+            raise ValidationError('No file uploaded')
+        file_format = (request.data.get('format') or uploaded_file.name.rsplit('.', 1)[-1]).lower()
+        if file_format not in ('csv', 'ofx'):
+            raise ValidationError('Only csv and ofx files can be imported')
+
+        parse_rows = parse_ofx_rows if file_format == 'ofx' else parse_csv_rows
+        lines = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', errors='replace',
+                                 newline='')
+        try:
+            imported = TransactionImporter(request.user, cash_account_id).run(
+                parse_rows(lines), file_format)
+        except CashAccount.DoesNotExist as exception:
+            raise NotFound('Cash Account not found') from exception
+        except TransactionImportError as exception:
+            return Response({'errors': exception.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'imported': imported}, status=status.HTTP_201_CREATED)
 
 
 class DownloadTransactionReportView(APIView):
 
+    def get_report_maker(self, request_data):
+        try:
+            report_maker = ReportMaker(request_data)
+        except (TypeError, ValueError) as exception:
+            raise ValidationError('from_date and to_date must be dates as YYYY-MM-DD'
+                                  ) from exception
+        if report_maker.type != 'csv':
+            raise ValidationError('Unsupported report type')
+        return report_maker
+
     def get(self, request):
-        request_data = {**request.GET, 'user_id': request.user.id}
-        report = ReportMaker(request_data).make_report()
+        report_maker = self.get_report_maker({**request.GET, 'user_id': request.user.id})
         report_name = f'{request.user.username}_Transactions_Report.csv'
+        if request.GET.get('stream') in ('1', 'true'):
+            return StreamingHttpResponse(
+                report_maker.stream_report(),
+                content_type='text/csv',
+                headers={'Content-Disposition': f'attachment; filename="{report_name}"'},
+            )
+
+        report = report_maker.make_report()
         response = HttpResponse(
             content_type='text/csv',
             headers={'Content-Disposition': f'attachment; filename="{report_name}"'},
         )
         response.write(report)
         return response
+
+    def post(self, request):
+        request_data = {key: [request.data.get(key)]
+                        for key in ('from_date', 'to_date', 'report_type')}
+        request_data['user_id'] = request.user.id
+        report_maker = self.get_report_maker(request_data)
+
+        report_key = {'user_id': request.user.id,
+                      'from_date': report_maker.from_date,
+                      'to_date': report_maker.to_date,
+                      'report_type': report_maker.type,
+                      'data_version': report_maker.get_data_version()}
+        stale_before = now() - timedelta(seconds=settings.TRANSACTION_REPORT_TIMEOUT)
+        report = TransactionReport.objects.filter(
+            Q(status=ReportStatus.Ready) |
+            Q(status=ReportStatus.Pending, creation_time__gte=stale_before), **report_key
+        ).order_by('-creation_time').first()
+        if report and (report.status == ReportStatus.Pending or
+                       report.file.storage.exists(report.file.name)):
+            return Response(TransactionReportSerializer(report).data, status=status.HTTP_200_OK)
+
+        report = TransactionReport.objects.create(**report_key)
+        db_transaction.on_commit(lambda: generate_transaction_report.delay(report.id))
+        return Response(TransactionReportSerializer(report).data, status=status.HTTP_202_ACCEPTED)
+
+
+class TransactionReportView(generics.RetrieveAPIView):
+    serializer_class = TransactionReportSerializer
+
+    def get_queryset(self):
+        return TransactionReport.objects.filter(user=self.request.user.id)
+
+
+class TransactionReportFileView(generics.GenericAPIView):
+
+    def get_queryset(self):
+        return TransactionReport.objects.filter(user=self.request.user.id,
+                                                status=ReportStatus.Ready)
+
+    def get(self, request, pk):
+        report = get_object_or_404(self.get_queryset(), pk=pk)
+        report_name = f'{request.user.username}_Transactions_Report.{report.report_type}'
+        return FileResponse(report.file.open('rb'), as_attachment=True, filename=report_name)